@@ -1,59 +1,116 @@
+from datetime import datetime
 from typing import Any, List, Optional
-from fastapi import APIRouter, HTTPException, Query, status, Response
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
 from app.crud.lead import lead
-from app.models.lead import Lead, LeadCreate, LeadUpdate, LeadPaginatedResponse
-from app.models.enums import Stage, SortField, EngagementStatus
+from app.models.lead import (
+    Lead,
+    LeadCreate,
+    LeadUpdate,
+    LeadListResponse,
+    LeadBulkCreate,
+    LeadBulkCreateResponse,
+    LeadBulkUpdate,
+    LeadBulkUpdateResponse,
+    StageEventPaginatedResponse,
+    PipelineStats,
+    EXPORT_FIELDS,
+    LEAD_FIELDS,
+    LEAD_SUMMARY_FIELDS
+)
+from app.models.enums import Stage, SortField, EngagementStatus, ExportFormat
+from app.core.export import abort_on_error, iter_csv, iter_ndjson
+from app.core.json import ModelJSONResponse
 from app.core.exceptions import (
     LeadNotFoundException,
     DuplicateLeadException,
-    InvalidStageTransitionException
+    InvalidStageTransitionException,
+    InvalidCursorException,
+    InvalidFieldsException
 )
 from app.core.logging import logger
 from app.websocket.connection import manager
 
 router = APIRouter()
 
+def _parse_fields(fields: Optional[str], allowed: List[str], default: List[str]) -> List[str]:
+    """Split a comma-separated fields parameter, rejecting names not in `allowed`"""
+    if not fields:
+        return default
+    columns = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in columns if name not in allowed]
+    if unknown or not columns:
+        raise InvalidFieldsException(unknown or [fields])
+    return columns
+
 @router.get(
     "/",
-    response_model=LeadPaginatedResponse,
+    response_model=LeadListResponse,
     status_code=status.HTTP_200_OK,
     summary="Get all leads",
-    description="Retrieve leads with pagination, sorting, and search capabilities"
+    description=(
+        "Retrieve leads with pagination, sorting, and search capabilities. "
+        f"Items hold {', '.join(LEAD_SUMMARY_FIELDS)} unless other fields are selected."
+    )
 )
 async def get_leads(
-    response: Response,
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
     sort_by: SortField = Query(SortField.CREATED_AT, description="Sort field"),
     sort_desc: bool = Query(True, description="Sort descending"),
-    search: Optional[str] = Query(None, min_length=1, description="Search term")
-) -> LeadPaginatedResponse:
+    search: Optional[str] = Query(None, min_length=1, description="Search term"),
+    cursor: Optional[str] = Query(
+        None,
+        min_length=1,
+        description="Opaque cursor from a previous response's next_cursor; takes precedence over page"
+    ),
+    fields: Optional[str] = Query(
+        None,
+        min_length=1,
+        description=(
+            f"Comma-separated fields to return, from: {', '.join(LEAD_FIELDS)}. "
+            "id and the sort field are always included"
+        )
+    )
+) -> Response:
     """Get paginated leads with optional filtering and sorting"""
     try:
-        skip = (page - 1) * page_size
+        columns = _parse_fields(fields, LEAD_FIELDS, LEAD_SUMMARY_FIELDS)
+        skip = 0 if cursor else (page - 1) * page_size
         
-        items = await lead.get_multi(
+        result = await lead.get_page(
             skip=skip,
+            cursor=cursor,
             limit=page_size,
             sort_by=sort_by.value,
             sort_desc=sort_desc,
-            search=search
+            search=search,
+            fields=columns
         )
         
-        total_count = await lead.get_count(search)
-        total_pages = (total_count + page_size - 1) // page_size
+        if not result.items:
+            # A 204 must not carry a body
+            return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+        total_pages = (result.total + page_size - 1) // page_size
         
-        if not items:
-            response.status_code = status.HTTP_204_NO_CONTENT
-            
-        return LeadPaginatedResponse(
-            items=items,
-            total=total_count,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages
+        return ModelJSONResponse(
+            LeadListResponse(
+                items=result.items,
+                total=result.total,
+                total_estimated=result.total_estimated,
+                page=None if cursor else page,
+                page_size=page_size,
+                total_pages=total_pages,
+                next_cursor=result.next_cursor
+            )
         )
         
+    except (InvalidCursorException, InvalidFieldsException) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching leads: {str(e)}")
         raise HTTPException(
@@ -68,12 +125,12 @@ async def get_leads(
     summary="Create lead",
     description="Create a new lead with initial stage"
 )
-async def create_lead(lead_data: LeadCreate, user_id: str = Query(...)) -> Lead:
+async def create_lead(lead_data: LeadCreate, user_id: str = Query(...)) -> ModelJSONResponse:
     """Create a new lead"""
     try:
         created_lead = await lead.create(lead_data)
         await manager.broadcast_lead_change(created_lead, "create", user_id)
-        return created_lead
+        return ModelJSONResponse(created_lead, status_code=status.HTTP_201_CREATED)
     except DuplicateLeadException as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
@@ -86,6 +143,143 @@ async def create_lead(lead_data: LeadCreate, user_id: str = Query(...)) -> Lead:
             detail="Error creating lead"
         )
 
+@router.post(
+    "/bulk",
+    response_model=LeadBulkCreateResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Bulk create leads",
+    description="Create a batch of leads in one request; duplicate emails are reported, not fatal"
+)
+async def bulk_create_leads(leads_in: LeadBulkCreate, user_id: str = Query(...)) -> ModelJSONResponse:
+    """Create many leads with a single insert and a single broadcast"""
+    try:
+        result = await lead.create_many(leads_in.leads)
+        if result.inserted_ids:
+            await manager.broadcast_bulk_change(result.inserted_ids, "create", user_id)
+        return ModelJSONResponse(
+            LeadBulkCreateResponse(
+                created=len(result.inserted_ids),
+                ids=result.inserted_ids,
+                duplicates=result.duplicate_emails
+            ),
+            status_code=status.HTTP_201_CREATED
+        )
+    except Exception as e:
+        logger.error(f"Error bulk creating leads: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error creating leads"
+        )
+
+@router.put(
+    "/bulk",
+    response_model=LeadBulkUpdateResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Bulk update leads",
+    description="Apply one patch and/or stage move to leads selected by ids or by filter"
+)
+async def bulk_update_leads(update_in: LeadBulkUpdate, user_id: str = Query(...)) -> ModelJSONResponse:
+    """Update many leads and send a single broadcast"""
+    try:
+        update_data = update_in.update_data()
+        if update_in.ids is not None:
+            result = await lead.update_many(update_in.ids, update_data)
+            if result.ids:
+                await manager.broadcast_bulk_change(result.ids, "update", user_id)
+        else:
+            result = await lead.update_matching(
+                update_data,
+                search=update_in.filter.search,
+                current_stage=update_in.filter.current_stage.value if update_in.filter.current_stage else None,
+                engaged=update_in.filter.engaged
+            )
+            if result.matched:
+                # A filter can match any number of leads, so the broadcast only carries the count
+                await manager.broadcast_bulk_change(None, "update", user_id, count=result.matched)
+
+        return ModelJSONResponse(LeadBulkUpdateResponse(
+            matched=result.matched,
+            modified=result.modified,
+            ids=result.ids
+        ))
+    except Exception as e:
+        logger.error(f"Error bulk updating leads: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error updating leads"
+        )
+
+@router.get(
+    "/stats",
+    response_model=PipelineStats,
+    status_code=status.HTTP_200_OK,
+    summary="Get pipeline stats",
+    description="Get lead counts per stage and by engagement without scanning the leads"
+)
+async def get_pipeline_stats() -> ModelJSONResponse:
+    """Get the materialized pipeline counters"""
+    try:
+        return ModelJSONResponse(await lead.get_stats())
+    except Exception as e:
+        logger.error(f"Error fetching pipeline stats: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error fetching pipeline stats"
+        )
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    summary="Export leads",
+    description="Stream all matching leads as CSV or NDJSON",
+    response_class=StreamingResponse
+)
+async def export_leads(
+    format: ExportFormat = Query(ExportFormat.CSV, description="Export file format"),
+    fields: Optional[str] = Query(
+        None,
+        min_length=1,
+        description=f"Comma-separated columns to export, from: {', '.join(EXPORT_FIELDS)}"
+    ),
+    sort_by: SortField = Query(SortField.CREATED_AT, description="Sort field"),
+    sort_desc: bool = Query(True, description="Sort descending"),
+    search: Optional[str] = Query(None, min_length=1, description="Search term")
+) -> StreamingResponse:
+    """Stream leads straight from the database cursor, one chunk at a time"""
+    try:
+        columns = _parse_fields(fields, EXPORT_FIELDS, EXPORT_FIELDS)
+
+        docs = lead.stream(
+            fields=columns,
+            sort_by=sort_by.value,
+            sort_desc=sort_desc,
+            search=search
+        )
+
+        if format == ExportFormat.NDJSON:
+            content, media_type = iter_ndjson(docs), "application/x-ndjson"
+        else:
+            content, media_type = iter_csv(docs, columns), "text/csv; charset=utf-8"
+
+        filename = f"leads-{datetime.utcnow():%Y-%m-%d}.{format.value}"
+        return StreamingResponse(
+            abort_on_error(content, "leads export"),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    except InvalidFieldsException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error exporting leads: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error exporting leads"
+        )
+
 @router.get(
     "/{lead_id}",
     response_model=Lead,
@@ -93,13 +287,13 @@ async def create_lead(lead_data: LeadCreate, user_id: str = Query(...)) -> Lead:
     summary="Get lead",
     description="Get a specific lead by ID"
 )
-async def get_lead(lead_id: str, response: Response) -> Lead:
+async def get_lead(lead_id: str) -> ModelJSONResponse:
     """Get a specific lead by ID"""
     try:
         db_lead = await lead.get(lead_id)
         if not db_lead:
             raise LeadNotFoundException(lead_id)
-        return db_lead
+        return ModelJSONResponse(db_lead)
         
     except LeadNotFoundException as e:
         raise HTTPException(
@@ -113,6 +307,45 @@ async def get_lead(lead_id: str, response: Response) -> Lead:
             detail=f"Error fetching lead {lead_id}"
         )
 
+@router.get(
+    "/{lead_id}/history",
+    response_model=StageEventPaginatedResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get stage history",
+    description="Get a page of a lead's stage transitions, oldest first"
+)
+async def get_lead_history(
+    lead_id: str,
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=100, description="Transitions per page")
+) -> ModelJSONResponse:
+    """Get a lead's stage history"""
+    try:
+        # Raises LeadNotFoundException if the lead doesn't exist
+        await lead.get(lead_id)
+
+        skip = (page - 1) * page_size
+        events, total = await lead.get_stage_history(lead_id, skip=skip, limit=page_size)
+        return ModelJSONResponse(StageEventPaginatedResponse(
+            items=events,
+            total=total,
+            page=page,
+            page_size=page_size,
+            total_pages=(total + page_size - 1) // page_size
+        ))
+
+    except LeadNotFoundException as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error fetching stage history for lead {lead_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching stage history for lead {lead_id}"
+        )
+
 @router.put(
     "/{lead_id}",
     response_model=Lead,
@@ -120,30 +353,36 @@ async def get_lead(lead_id: str, response: Response) -> Lead:
     summary="Update lead",
     description="Update an existing lead"
 )
-async def update_lead(lead_id: str, lead_in: dict, user_id: str = Query(...)) -> Lead:
+async def update_lead(lead_id: str, lead_in: LeadUpdate, user_id: str = Query(...)) -> ModelJSONResponse:
     """Update a lead"""
     try:
-        # Validate the lead exists first
-        existing_lead = await lead.get(lead_id)
-        if not existing_lead:
-            raise LeadNotFoundException(lead_id)
-
-        # Clean the update data
-        update_data = {k: v for k, v in lead_in.items() if v is not None}
+        # Only validated fields are written, so stored leads can be read back without validation
+        update_data = lead_in.model_dump(exclude_none=True)
         
-        # Perform the update
-        updated_lead = await lead.update(id=lead_id, update_data=update_data)
+        # Perform the update; raises LeadNotFoundException if the lead doesn't exist
+        updated_lead, stage_event = await lead.update_with_event(id=lead_id, update_data=update_data)
         
         # Broadcast the change
-        await manager.broadcast_lead_change(updated_lead, "update", user_id)
+        await manager.broadcast_lead_change(
+            updated_lead,
+            "update",
+            user_id,
+            changed_fields=lead.written_fields(update_data),
+            previous_stage=stage_event.from_stage if stage_event else None
+        )
         
-        return updated_lead
+        return ModelJSONResponse(updated_lead)
         
     except LeadNotFoundException as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except DuplicateLeadException as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except InvalidStageTransitionException as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -153,7 +392,7 @@ async def update_lead(lead_id: str, lead_in: dict, user_id: str = Query(...)) ->
         logger.error(f"Error updating lead {lead_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error updating lead: {str(e)}"
+            detail="Error updating lead"
         )
 
 @router.delete(
@@ -163,12 +402,12 @@ async def update_lead(lead_id: str, lead_in: dict, user_id: str = Query(...)) ->
     summary="Delete lead",
     description="Delete a lead by ID"
 )
-async def delete_lead(lead_id: str, user_id: str = Query(...)) -> Lead:
+async def delete_lead(lead_id: str, user_id: str = Query(...)) -> ModelJSONResponse:
     """Delete a lead"""
     try:
         deleted_lead = await lead.delete(lead_id)
         await manager.broadcast_lead_change(deleted_lead, "delete", user_id)
-        return deleted_lead
+        return ModelJSONResponse(deleted_lead)
     except LeadNotFoundException as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
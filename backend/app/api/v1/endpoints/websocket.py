@@ -1,4 +1,8 @@
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from app.core.logging import logger
+from app.models.lead import LeadSubscription
 from app.websocket.connection import manager
 
 router = APIRouter()
@@ -8,7 +12,15 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     await manager.connect(websocket, client_id)
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
+            # Clients send subscription messages to choose the changes they receive:
+            # {"type": "subscribe", "stages": [...], "engaged": true, "search": "...", "leadIds": [...]}
+            message = await websocket.receive_text()
+            try:
+                data = json.loads(message)
+                if not isinstance(data, dict) or data.get("type") != "subscribe":
+                    continue
+                manager.subscribe(client_id, LeadSubscription.model_validate(data))
+            except (ValueError, ValidationError) as e:
+                logger.warning(f"Ignoring invalid message from client {client_id}: {str(e)}")
     except WebSocketDisconnect:
-        manager.disconnect(client_id) 
\ No newline at end of file
+        manager.disconnect(client_id, websocket)
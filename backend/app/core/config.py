@@ -1,3 +1,4 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 import os
 from dotenv import load_dotenv
@@ -19,6 +20,43 @@ class Settings(BaseSettings):
     # MongoDB configuration
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     MONGODB_DATABASE: str = os.getenv("MONGODB_DATABASE", "leads_db")
+    MONGODB_ENSURE_INDEXES: bool = True
+    
+    # Connection pool; the minimum is opened at startup and kept open
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10
+    # Close connections idle for longer than this; None keeps them open
+    MONGODB_MAX_IDLE_TIME_MS: Optional[int] = None
+    # How long an operation waits for a free connection before failing; None waits indefinitely
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    
+    # Log reads slower than this; None disables slow query detection.
+    # A sampled fraction is explained, each query shape at most once per interval.
+    SLOW_QUERY_THRESHOLD_MS: Optional[float] = None
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = 0.1
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = 600.0
+    
+    # Filtered list counts are cached until the next write or the TTL expires
+    COUNT_CACHE_TTL_SECONDS: float = 30.0
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+    
+    # Read-through cache for single lead lookups; 0 entries disables it.
+    # Invalidation is per process, so with several workers another worker can
+    # serve a lead up to LEAD_CACHE_TTL_SECONDS old. Opt in with a size.
+    LEAD_CACHE_MAX_ENTRIES: int = 0
+    LEAD_CACHE_TTL_SECONDS: float = 10.0
+    
+    # WebSocket fan-out: per-client send queue and what to do when it fills up
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+    WS_SLOW_CONSUMER_POLICY: Literal["disconnect", "drop_oldest"] = "disconnect"
+    # Changes within this window are merged into one frame; 0 sends each change immediately
+    WS_COALESCE_WINDOW_MS: int = 50
+    
+    # How broadcasts reach clients of other workers; use "mongodb" with more than one worker
+    BROADCAST_BACKPLANE: Literal["memory", "mongodb"] = "memory"
+    BROADCAST_COLLECTION: str = "broadcast_events"
+    BROADCAST_COLLECTION_SIZE_BYTES: int = 8 * 1024 * 1024
     
     # Test configuration
     TEST_MONGODB_DATABASE: str = "leads_test_db"
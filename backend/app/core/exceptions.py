@@ -30,4 +30,17 @@ class InvalidStageTransitionException(BaseAPIException):
         super().__init__(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid stage transition from {from_stage} to {to_stage}"
-        ) 
\ No newline at end of file
+        ) 
+class InvalidCursorException(BaseAPIException):
+    def __init__(self, reason: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid pagination cursor: {reason}"
+        )
+
+class InvalidFieldsException(BaseAPIException):
+    def __init__(self, fields: list):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown lead fields: {', '.join(fields)}"
+        )
@@ -0,0 +1,70 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+from app.core.json import json_dumps
+from app.core.logging import logger
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_csv(
+    docs: AsyncIterator[Dict[str, Any]],
+    fields: List[str],
+    chunk_rows: int = 500
+) -> AsyncIterator[str]:
+    """
+    Encode documents as CSV, yielding one chunk per `chunk_rows` rows so the
+    response is streamed without holding the whole export in memory.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    rows = 0
+    async for doc in docs:
+        writer.writerow([_csv_value(doc.get(name)) for name in fields])
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+async def iter_ndjson(
+    docs: AsyncIterator[Dict[str, Any]],
+    chunk_rows: int = 500
+) -> AsyncIterator[str]:
+    """Encode documents as newline-delimited JSON, chunked like iter_csv"""
+    lines = []
+    async for doc in docs:
+        lines.append(json_dumps(doc))
+        if len(lines) == chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+async def abort_on_error(chunks: AsyncIterator[str], description: str) -> AsyncIterator[str]:
+    """
+    Pass chunks through, logging a failure before re-raising it. The status
+    and headers have already been sent by then, so the error propagates to
+    the server, which drops the connection without ending the chunked body;
+    clients see an incomplete transfer instead of a truncated file.
+    """
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception as e:
+        logger.error(f"Error streaming {description}, aborting the response: {str(e)}")
+        raise
@@ -1,11 +1,31 @@
-from datetime import datetime
-import json
+from typing import Any
+from bson import ObjectId
+from fastapi import Response
+from pydantic_core import to_json
 
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+def _fallback(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-def json_dumps(obj):
-    return json.dumps(obj, cls=CustomJSONEncoder) 
\ No newline at end of file
+def json_bytes(obj: Any) -> bytes:
+    """
+    Encode to JSON in a single pass through pydantic-core. Handles Pydantic
+    models, datetimes (as ISO 8601), enums and ObjectIds without building an
+    intermediate dict first.
+    """
+    return to_json(obj, fallback=_fallback)
+
+def json_dumps(obj: Any) -> str:
+    return json_bytes(obj).decode()
+
+class ModelJSONResponse(Response):
+    """
+    JSON response encoded by json_bytes. Endpoints that return one directly,
+    with the model as content, skip FastAPI's validate-and-convert pass over
+    the response model as well as the stdlib encoder.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content)
@@ -0,0 +1,77 @@
+import base64
+import binascii
+from typing import Any, Dict, Optional, Tuple
+from bson import ObjectId, json_util
+from app.core.exceptions import InvalidCursorException
+
+
+def encode_cursor(sort_by: str, sort_desc: bool, value: Any, last_id: ObjectId) -> str:
+    """
+    Encode the position after a document into an opaque cursor string.
+    The cursor remembers the sort it was issued for so it cannot be replayed
+    against a different ordering.
+    """
+    payload = {"s": sort_by, "d": sort_desc, "v": value, "i": last_id}
+    raw = json_util.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_desc: bool) -> Tuple[Any, ObjectId]:
+    """Decode a cursor into the (sort value, _id) pair it points after"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value, last_id = payload["v"], payload["i"]
+        issued_sort, issued_desc = payload["s"], payload["d"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise InvalidCursorException("malformed cursor")
+
+    if not isinstance(last_id, ObjectId):
+        raise InvalidCursorException("malformed cursor")
+    if issued_sort != sort_by or issued_desc != sort_desc:
+        raise InvalidCursorException("cursor was issued for a different sort order")
+    return value, last_id
+
+
+def build_keyset_filter(sort_by: str, sort_desc: bool, value: Any, last_id: ObjectId) -> Dict[str, Any]:
+    """
+    Build the filter selecting documents strictly after (value, last_id) in the
+    order given by sort [(sort_by, direction), ("_id", direction)].
+
+    MongoDB sorts null/missing values before everything else, so they come
+    first when ascending and last when descending.
+    """
+    if sort_desc:
+        if value is None:
+            return {sort_by: None, "_id": {"$lt": last_id}}
+        return {
+            "$or": [
+                {sort_by: {"$lt": value}},
+                {sort_by: value, "_id": {"$lt": last_id}},
+                {sort_by: None},
+            ]
+        }
+
+    if value is None:
+        return {
+            "$or": [
+                {sort_by: None, "_id": {"$gt": last_id}},
+                {sort_by: {"$ne": None}},
+            ]
+        }
+    return {
+        "$or": [
+            {sort_by: {"$gt": value}},
+            {sort_by: value, "_id": {"$gt": last_id}},
+        ]
+    }
+
+
+def merge_filters(*filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine several filter documents with $and, dropping empty ones"""
+    parts = [f for f in filters if f]
+    if not parts:
+        return {}
+    if len(parts) == 1:
+        return parts[0]
+    return {"$and": parts}
@@ -1,12 +1,55 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+from collections import Counter
+from typing import List, Optional, Dict, Any, Iterable, Tuple, NamedTuple, AsyncIterator, Union
 from datetime import datetime, timedelta
-from bson import ObjectId
+from bson import ObjectId, json_util
 from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorCollection
-from app.models.lead import Lead, LeadCreate, LeadUpdate, StageChange
-from app.core.exceptions import LeadNotFoundException, DuplicateLeadException
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.models.lead import Lead, LeadCreate, LeadUpdate, StageEvent, PipelineStats, PipelineStatsReconciliation
+from app.core.exceptions import LeadNotFoundException, DuplicateLeadException, InvalidCursorException
+from app.core.pagination import encode_cursor, decode_cursor, build_keyset_filter, merge_filters
 from app.db.database import get_database
 from app.core.logging import logger
-from app.models.enums import Stage, EngagementStatus
+from app.core.cache import TTLCache
+from app.core.metrics import registry
+from app.core.config import settings
+from app.models.enums import Stage, SortField, EngagementStatus
+
+# A full lead, or a dict of selected fields when reading with a projection
+LeadItem = Union[Lead, Dict[str, Any]]
+
+
+class LeadPage(NamedTuple):
+    """A page of leads with its total and the cursor for the next page"""
+    items: List[LeadItem]
+    total: int
+    next_cursor: Optional[str]
+    total_estimated: bool
+
+
+class BulkCreateResult(NamedTuple):
+    """Outcome of a bulk insert"""
+    inserted_ids: List[str]
+    duplicate_emails: List[str]
+
+
+class BulkUpdateResult(NamedTuple):
+    """Outcome of a bulk update; ids of the updated leads, when they were tracked"""
+    matched: int
+    modified: int
+    ids: Optional[List[str]] = None
+
+
+# MongoDB error code for unique index violations
+DUPLICATE_KEY_ERROR = 11000
+
+# Leads read and written per round trip by bulk stage and engagement updates
+BULK_UPDATE_BATCH_SIZE = 1000
+
+# _id of the pipeline_stats document holding the lead counters
+PIPELINE_STATS_ID = "leads"
+
 
 class CRUDLead:
     """
@@ -15,19 +58,57 @@ class CRUDLead:
     """
     def __init__(self):
         self.collection_name = "leads"
-        self.db = get_database()
+        self.events_collection_name = "lead_stage_events"
+        self.stats_collection_name = "pipeline_stats"
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._count_cache: TTLCache[int] = TTLCache(
+            maxsize=settings.COUNT_CACHE_MAX_ENTRIES,
+            ttl=settings.COUNT_CACHE_TTL_SECONDS
+        )
+        self._lead_cache: TTLCache[Lead] = TTLCache(
+            maxsize=settings.LEAD_CACHE_MAX_ENTRIES,
+            ttl=settings.LEAD_CACHE_TTL_SECONDS
+        )
+        self._email_ids: TTLCache[str] = TTLCache(
+            maxsize=settings.LEAD_CACHE_MAX_ENTRIES,
+            ttl=settings.LEAD_CACHE_TTL_SECONDS
+        )
+        self._register_cache_metrics()
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        """The database to use; the shared application database unless one was assigned"""
+        if self._db is not None:
+            return self._db
+        return get_database()
+
+    @db.setter
+    def db(self, value: AsyncIOMotorDatabase) -> None:
+        self._db = value
 
     def get_collection(self) -> AsyncIOMotorCollection:
         return self.db[self.collection_name]
 
+    def get_events_collection(self) -> AsyncIOMotorCollection:
+        return self.db[self.events_collection_name]
+
+    def get_stats_collection(self) -> AsyncIOMotorCollection:
+        return self.db[self.stats_collection_name]
+
     async def get(self, id: str) -> Optional[Lead]:
-        """Get a lead by ID"""
+        """Get a lead by ID, served from the lead cache when possible"""
+        cached = self._lead_cache.get(id)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
         try:
             collection = self.get_collection()
             lead_dict = await collection.find_one({"_id": ObjectId(id)})
             if not lead_dict:
                 raise LeadNotFoundException(id)
-            return Lead(**self._convert_id(lead_dict))
+            lead = Lead.from_document(self._convert_id(lead_dict))
+            self._cache_lead(lead)
+            return lead
         except LeadNotFoundException:
             raise
         except Exception as e:
@@ -35,14 +116,57 @@ class CRUDLead:
             raise
 
     async def get_by_email(self, email: str) -> Optional[Lead]:
-        """Get a single lead by email"""
+        """Get a single lead by email, served from the lead cache when possible"""
+        id = self._email_ids.get(email)
+        if id is not None:
+            cached = self._lead_cache.get(id)
+            # The email may have changed since the mapping was cached
+            if cached is not None and cached.email == email:
+                return cached.model_copy(deep=True)
+
         collection = self.get_collection()
         lead_dict = await collection.find_one({"email": email})
         if lead_dict:
-            lead_dict["id"] = str(lead_dict.pop("_id"))
-            return Lead(**lead_dict)
+            lead = Lead.from_document(self._convert_id(lead_dict))
+            self._cache_lead(lead)
+            return lead
         return None
 
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters and sizes of the lead and count caches"""
+        return {
+            "leads": self._lead_cache.stats(),
+            "counts": self._count_cache.stats(),
+        }
+
+    def _register_cache_metrics(self) -> None:
+        """
+        Export the cache counters, read from cache_stats when scraped. The
+        registry keeps the first metric of a name, so the global instance's
+        counters are the ones exported.
+        """
+        for metric_name, kind, description, key in (
+            ("lead_cache_hits_total", "counter", "Lookups served from a CRUD cache, by cache", "hits"),
+            ("lead_cache_misses_total", "counter", "Lookups a CRUD cache could not serve, by cache", "misses"),
+            ("lead_cache_entries", "gauge", "Entries held by a CRUD cache, by cache", "size"),
+        ):
+            registry.callback(
+                metric_name,
+                description,
+                kind,
+                lambda key=key: {(cache,): stats[key] for cache, stats in self.cache_stats().items()},
+                ("cache",)
+            )
+
+    def _cache_lead(self, lead: Lead) -> None:
+        # Keep a private copy so callers mutating their result can't corrupt the cache
+        self._lead_cache.set(lead.id, lead.model_copy(deep=True))
+        self._email_ids.set(lead.email, lead.id)
+
+    def _invalidate_lead(self, id: str) -> None:
+        """Drop a lead from the cache after it was written or deleted"""
+        self._lead_cache.pop(id)
+
     async def get_multi(
         self,
         *,
@@ -50,36 +174,26 @@ class CRUDLead:
         limit: int = 10,
         sort_by: str = "created_at",
         sort_desc: bool = True,
-        search: Optional[str] = None
-    ) -> List[Lead]:
+        search: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[LeadItem]:
         """
-        Get multiple leads with filtering, sorting and pagination
+        Get multiple leads with filtering, sorting and pagination.
+        With `fields`, only those fields are read and leads come back as dicts.
         """
         try:
             collection = self.get_collection()
             
             # Build query
-            filter_query = {}
-            if search:
-                filter_query = {
-                    "$or": [
-                        {"name": {"$regex": search, "$options": "i"}},
-                        {"email": {"$regex": search, "$options": "i"}},
-                        {"company": {"$regex": search, "$options": "i"}}
-                    ]
-                }
+            filter_query = self._build_search_filter(search)
 
-            # Build sort query
-            sort_direction = -1 if sort_desc else 1
-            
-            cursor = collection.find(filter_query)
-            cursor = cursor.sort(sort_by, sort_direction)
+            cursor = collection.find(filter_query, self._build_projection(fields, sort_by))
+            cursor = cursor.sort(self._build_sort(sort_by, sort_desc))
             cursor = cursor.skip(skip).limit(limit)
             
             leads = []
             async for doc in cursor:
-                doc["id"] = str(doc.pop("_id"))
-                leads.append(Lead(**doc))
+                leads.append(self._build_item(doc, fields, sort_by))
                 
             return leads
             
@@ -87,6 +201,256 @@ class CRUDLead:
             logger.error(f"Error fetching leads: {str(e)}")
             raise
 
+    async def get_multi_after(
+        self,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        sort_by: str = "created_at",
+        sort_desc: bool = True,
+        search: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[LeadItem], Optional[str]]:
+        """
+        Keyset pagination: get the leads following `cursor` in (sort_by, _id)
+        order, along with the cursor for the next page (None on the last page).
+        Unlike skip-based paging, the cost does not grow with page depth.
+        """
+        try:
+            collection = self.get_collection()
+
+            filter_query = self._build_search_filter(search)
+            if cursor:
+                value, last_id = decode_cursor(cursor, sort_by, sort_desc)
+                filter_query = merge_filters(
+                    filter_query,
+                    build_keyset_filter(self._sort_key(sort_by), sort_desc, value, last_id)
+                )
+
+            # Fetch one extra document to know whether another page exists
+            db_cursor = collection.find(filter_query, self._build_projection(fields, sort_by))
+            db_cursor = db_cursor.sort(self._build_sort(sort_by, sort_desc))
+            db_cursor = db_cursor.limit(limit + 1)
+            docs = await db_cursor.to_list(length=limit + 1)
+
+            has_more = len(docs) > limit
+            leads = [self._build_item(doc, fields, sort_by) for doc in docs[:limit]]
+
+            next_cursor = None
+            if has_more:
+                next_cursor = self.cursor_after(leads[-1], sort_by, sort_desc)
+
+            return leads, next_cursor
+
+        except InvalidCursorException:
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching leads: {str(e)}")
+            raise
+
+    async def get_page(
+        self,
+        *,
+        skip: int = 0,
+        cursor: Optional[str] = None,
+        limit: int = 10,
+        sort_by: str = "created_at",
+        sort_desc: bool = True,
+        search: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> LeadPage:
+        """
+        Get a page of leads together with the total matching count and the
+        cursor for the next page.
+
+        Unfiltered totals come from collection metadata and filtered totals
+        from the count cache when possible. Otherwise offset pages run as one
+        aggregation whose $facet returns both the items and the count, so the
+        search filter is evaluated once in one round trip. Keyset pages can't
+        share that pipeline without losing their index seek, so the page and
+        the count run concurrently instead.
+
+        With `fields`, items are dicts holding only those fields plus id and
+        the sort field, which the next cursor is built from.
+        """
+        if cursor:
+            (leads, next_cursor), (total, estimated) = await asyncio.gather(
+                self.get_multi_after(
+                    cursor=cursor,
+                    limit=limit,
+                    sort_by=sort_by,
+                    sort_desc=sort_desc,
+                    search=search,
+                    fields=fields
+                ),
+                self.get_total(search)
+            )
+            return LeadPage(leads, total, next_cursor, estimated)
+
+        filter_query = self._build_search_filter(search)
+        if not filter_query or self._count_key(filter_query) in self._count_cache:
+            leads, (total, estimated) = await asyncio.gather(
+                self.get_multi(
+                    skip=skip,
+                    limit=limit,
+                    sort_by=sort_by,
+                    sort_desc=sort_desc,
+                    search=search,
+                    fields=fields
+                ),
+                self.get_total(search)
+            )
+        else:
+            leads, total = await self._get_multi_with_count(
+                filter_query, skip=skip, limit=limit, sort_by=sort_by, sort_desc=sort_desc, fields=fields
+            )
+            self._count_cache.set(self._count_key(filter_query), total)
+            estimated = False
+
+        next_cursor = None
+        if leads and skip + len(leads) < total:
+            next_cursor = self.cursor_after(leads[-1], sort_by, sort_desc)
+
+        return LeadPage(leads, total, next_cursor, estimated)
+
+    async def _get_multi_with_count(
+        self,
+        filter_query: Dict[str, Any],
+        *,
+        skip: int,
+        limit: int,
+        sort_by: str,
+        sort_desc: bool,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[List[LeadItem], int]:
+        """Get an offset page and the exact filtered count from a single $facet aggregation"""
+        try:
+            collection = self.get_collection()
+
+            items_pipeline = [{"$skip": skip}, {"$limit": limit}]
+            projection = self._build_projection(fields, sort_by)
+            if projection:
+                items_pipeline.append({"$project": projection})
+
+            # $match and $sort precede $facet so they can still use an index
+            pipeline = [
+                {"$match": filter_query},
+                {"$sort": dict(self._build_sort(sort_by, sort_desc))},
+                {"$facet": {
+                    "items": items_pipeline,
+                    "total": [{"$count": "count"}]
+                }}
+            ]
+            result = await collection.aggregate(pipeline).to_list(length=1)
+            facets = result[0] if result else {"items": [], "total": []}
+
+            leads = [self._build_item(doc, fields, sort_by) for doc in facets["items"]]
+            total = facets["total"][0]["count"] if facets["total"] else 0
+            return leads, total
+
+        except Exception as e:
+            logger.error(f"Error fetching leads: {str(e)}")
+            raise
+
+    def cursor_after(self, lead: LeadItem, sort_by: str, sort_desc: bool) -> str:
+        """Build the cursor pointing just after `lead` in the given sort order"""
+        if isinstance(lead, dict):
+            value, id = lead.get(sort_by), lead["id"]
+        else:
+            value, id = getattr(lead, sort_by), lead.id
+        if self._sort_key(sort_by) == "stage_rank":
+            value = Stage.rank(value)
+        return encode_cursor(sort_by, sort_desc, value, ObjectId(id))
+
+    def _sort_key(self, sort_by: str) -> str:
+        """Document field a sort orders on"""
+        try:
+            return SortField(sort_by).key
+        except ValueError:
+            return sort_by
+
+    def _build_projection(self, fields: Optional[List[str]], sort_by: str) -> Optional[Dict[str, int]]:
+        """Projection reading only `fields` and the sort field; None reads whole documents"""
+        if fields is None:
+            return None
+        projection = {name: 1 for name in fields if name != "id"}
+        projection[sort_by] = 1
+        return projection
+
+    def _build_item(self, doc: Dict[str, Any], fields: Optional[List[str]], sort_by: str) -> LeadItem:
+        """A full lead, or with `fields` a dict of just those fields plus id and the sort field"""
+        if fields is None:
+            return Lead.from_document(self._convert_id(doc))
+        item = {"id": str(doc["_id"])}
+        for name in fields:
+            if name != "id":
+                item[name] = doc.get(name)
+        item[sort_by] = doc.get(sort_by)
+        return item
+
+    def _build_lead_filter(
+        self,
+        *,
+        search: Optional[str] = None,
+        current_stage: Optional[str] = None,
+        engaged: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Combine the search filter with exact stage and engagement filters"""
+        field_filter = {}
+        if current_stage is not None:
+            field_filter["current_stage"] = current_stage
+        if engaged is not None:
+            field_filter["engaged"] = engaged
+        return merge_filters(self._build_search_filter(search), field_filter)
+
+    def _build_search_filter(self, search: Optional[str] = None) -> Dict[str, Any]:
+        """Build the case-insensitive search filter over name, email and company"""
+        if not search:
+            return {}
+        return {
+            "$or": [
+                {"name": {"$regex": search, "$options": "i"}},
+                {"email": {"$regex": search, "$options": "i"}},
+                {"company": {"$regex": search, "$options": "i"}}
+            ]
+        }
+
+    def _build_sort(self, sort_by: str, sort_desc: bool) -> List[Tuple[str, int]]:
+        """Sort on the requested field's sort key with _id as a unique tie-breaker"""
+        sort_direction = -1 if sort_desc else 1
+        return [(self._sort_key(sort_by), sort_direction), ("_id", sort_direction)]
+
+    async def stream(
+        self,
+        *,
+        fields: List[str],
+        sort_by: str = "created_at",
+        sort_desc: bool = True,
+        search: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream raw lead documents restricted to `fields`, using the same
+        filtering and ordering as get_multi. Documents are pulled from the
+        server one batch at a time, so memory use doesn't grow with the result.
+        """
+        try:
+            collection = self.get_collection()
+
+            projection = {name: 1 for name in fields if name != "id"}
+            projection["_id"] = 1 if "id" in fields else 0
+
+            cursor = collection.find(self._build_search_filter(search), projection)
+            cursor = cursor.sort(self._build_sort(sort_by, sort_desc))
+            cursor = cursor.batch_size(batch_size)
+
+            async for doc in cursor:
+                yield self._convert_id(doc)
+
+        except Exception as e:
+            logger.error(f"Error streaming leads: {str(e)}")
+            raise
+
     def _generate_stage_history(self, current_stage: str, base_time: datetime = None) -> List[Dict[str, Any]]:
         """Generate stage history for a lead based on current stage"""
         history = []
@@ -100,126 +464,619 @@ class CRUDLead:
             history.append({
                 "from_stage": stages[i-1] if i > 0 else None,
                 "to_stage": stages[i],
-                "changed_at": (base_time - timedelta(days=current_index - i)).isoformat(),
+                "changed_at": base_time - timedelta(days=current_index - i),
             })
 
         return history
 
-    async def create(self, lead_data: LeadCreate) -> Lead:
-        """Create a new lead with proper stage history"""
+    def build_stage_event(
+        self,
+        lead_id: ObjectId,
+        from_stage: Optional[str],
+        to_stage: str,
+        changed_at: Optional[datetime],
+        notes: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build the document stored in lead_stage_events for one transition"""
+        event = {
+            "lead_id": lead_id,
+            "from_stage": from_stage,
+            "to_stage": to_stage,
+            "changed_at": changed_at,
+        }
+        if notes is not None:
+            event["notes"] = notes
+        return event
+
+    async def get_stage_history(self, lead_id: str, *, skip: int = 0, limit: int = 50) -> Tuple[List[StageEvent], int]:
+        """
+        Get a page of a lead's stage transitions, oldest first, and the total
+        number of transitions. Served by the (lead_id, changed_at) index.
+        """
         try:
-            # Check for duplicate email
-            existing = await self.get_by_email(lead_data.email)
-            if existing:
-                raise DuplicateLeadException(lead_data.email)
+            events = self.get_events_collection()
+            filter_query = {"lead_id": ObjectId(lead_id)}
+            cursor = events.find(filter_query).sort([("changed_at", 1), ("_id", 1)]).skip(skip).limit(limit)
+            docs, total = await asyncio.gather(
+                cursor.to_list(length=limit),
+                events.count_documents(filter_query)
+            )
+            return [StageEvent.from_document(doc) for doc in docs], total
+        except Exception as e:
+            logger.error(f"Error fetching stage history for lead {lead_id}: {str(e)}")
+            raise
 
+    async def _record_stage_events(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Store stage transitions. The lead write they belong to has already
+        succeeded, so a failure here is logged and re-raised, leaving the
+        lead updated but its history short of those transitions.
+        """
+        if not events:
+            return
+        try:
+            await self.get_events_collection().insert_many(events, ordered=False)
+        except Exception as e:
+            logger.error(f"Error recording stage events: {str(e)}")
+            raise
+
+    async def create(self, lead_data: LeadCreate) -> Lead:
+        """
+        Create a new lead and record its initial stage history.
+        Duplicate emails are rejected by the unique email index.
+        """
+        try:
             collection = self.get_collection()
             
-            # Prepare lead data
-            lead_dict = lead_data.dict(exclude_none=True)
-            lead_dict.update({
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
-                "stage_history": self._generate_stage_history(lead_data.current_stage)
-            })
+            # Prepare lead data and its history before writing anything,
+            # so an unknown stage is rejected without a partial write
+            lead_dict = self.prepare_new_lead(lead_data)
+            lead_dict["_id"] = ObjectId()
+            events = self._initial_stage_events(lead_dict)
             
-            # Insert and return created lead
-            result = await collection.insert_one(lead_dict)
-            created_lead = await collection.find_one({"_id": result.inserted_id})
-            created_lead["id"] = str(created_lead.pop("_id"))
+            # Insert and build the created lead from what was written
+            await collection.insert_one(lead_dict)
+            self.invalidate_counts()
+            await self._record_created_events([lead_dict], events)
+            await self.inc_stats(self.stats_delta(added=[lead_dict]))
             
-            return Lead(**created_lead)
+            return Lead.from_document(self._convert_id(lead_dict))
             
+        except DuplicateKeyError:
+            raise DuplicateLeadException(lead_data.email)
         except Exception as e:
             logger.error(f"Error creating lead: {str(e)}")
             raise
 
+    async def create_many(self, leads_in: List[LeadCreate]) -> BulkCreateResult:
+        """
+        Insert a batch of leads with a single unordered insert_many.
+        Duplicates are detected by the unique email index rather than by
+        pre-reading each email, and the rest of the batch is still inserted.
+        """
+        if not leads_in:
+            return BulkCreateResult([], [])
+
+        collection = self.get_collection()
+        now = datetime.utcnow()
+        docs = [self.prepare_new_lead(lead_data, now) for lead_data in leads_in]
+        events_by_lead: Dict[ObjectId, List[Dict[str, Any]]] = {}
+        for doc in docs:
+            doc["_id"] = ObjectId()
+            events_by_lead[doc["_id"]] = self._initial_stage_events(doc)
+
+        # An unordered insert keeps writing past errors, so when the batch
+        # fails for any reason other than duplicates, the rows it did write
+        # are deleted again rather than kept without events or stats
+        failed: Dict[int, Dict[str, Any]] = {}
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+            other_errors = [error for error in failed.values() if error.get("code") != DUPLICATE_KEY_ERROR]
+            if other_errors:
+                logger.error(f"Error bulk creating leads: {other_errors[0].get('errmsg')}")
+                await self._discard_created(docs)
+                raise
+        except Exception as e:
+            logger.error(f"Error bulk creating leads: {str(e)}")
+            await self._discard_created(docs)
+            raise
+        finally:
+            self.invalidate_counts()
+
+        inserted = [doc for index, doc in enumerate(docs) if index not in failed]
+        await self._record_created_events(
+            inserted, [event for doc in inserted for event in events_by_lead[doc["_id"]]]
+        )
+        await self.inc_stats(self.stats_delta(added=inserted))
+
+        inserted_ids = [str(doc["_id"]) for doc in inserted]
+        duplicate_emails = [docs[index]["email"] for index in sorted(failed)]
+        return BulkCreateResult(inserted_ids, duplicate_emails)
+
+    async def _record_created_events(self, docs: List[Dict[str, Any]], events: List[Dict[str, Any]]) -> None:
+        """
+        Store the initial stage events of just-inserted leads. If that
+        fails the leads are deleted again, along with any of their events
+        that were written, rather than kept without a history.
+        """
+        try:
+            await self._record_stage_events(events)
+        except Exception:
+            await self._discard_created(docs)
+            raise
+
+    async def _discard_created(self, docs: List[Dict[str, Any]]) -> None:
+        """Delete leads of a failed create, by their pre-assigned ids, and any of their events"""
+        lead_ids = [doc["_id"] for doc in docs]
+        await self.get_collection().delete_many({"_id": {"$in": lead_ids}})
+        await self.get_events_collection().delete_many({"lead_id": {"$in": lead_ids}})
+        self.invalidate_counts()
+
+    def prepare_new_lead(self, lead_data: LeadCreate, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Build the document stored for a new lead"""
+        now = self.db_time(now)
+        lead_dict = lead_data.dict(exclude_none=True)
+        lead_dict.update({
+            "stage_rank": Stage.rank(lead_data.current_stage),
+            "created_at": now,
+            "updated_at": now,
+            "version": 1
+        })
+        return lead_dict
+
+    def _initial_stage_events(self, lead_dict: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stage events of a new lead, leading up to its current stage"""
+        return [
+            self.build_stage_event(lead_dict["_id"], **entry)
+            for entry in self._generate_stage_history(lead_dict["current_stage"], lead_dict["created_at"])
+        ]
+
+    def db_time(self, now: Optional[datetime] = None) -> datetime:
+        """`now` (default the current time) truncated to milliseconds as MongoDB stores it, so returned leads match later reads"""
+        now = now or datetime.utcnow()
+        return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
     async def update(self, id: str, update_data: Dict[str, Any]) -> Lead:
-        """Update a lead with stage history management"""
+        """Update a lead; see update_with_event"""
+        updated, _ = await self.update_with_event(id, update_data)
+        return updated
+
+    async def update_with_event(self, id: str, update_data: Dict[str, Any]) -> Tuple[Lead, Optional[StageEvent]]:
+        """
+        Update a lead and, when the stage actually changes, record the
+        transition in lead_stage_events. Returns the updated lead and the
+        recorded transition, if any.
+
+        The lead is written in one round trip that returns the document as it
+        was before, which is all that is needed both to build the updated lead
+        and to know which stage it left. The lead document no longer grows
+        with every transition.
+        """
         try:
             collection = self.get_collection()
-            
-            # Get current lead state
-            current_lead = await self.get(id)
-            if not current_lead:
-                raise LeadNotFoundException(id)
 
-            # Create a clean update dictionary
-            update_dict = {}
+            set_fields = self._build_set_fields(update_data)
+            new_stage = update_data.get("current_stage")
+            now = self.db_time()
+            pipeline = self._build_update_pipeline(set_fields, new_stage=new_stage, now=now)
             
-            # Copy basic fields
-            for key, value in update_data.items():
-                if value is not None and key not in ['stage_history', 'current_stage', 'engaged']:
-                    update_dict[key] = value
-
-            # Handle stage transitions
-            if "current_stage" in update_data:
-                stage_history = self._handle_stage_transition(
-                    current_lead,
-                    update_data["current_stage"]
+            try:
+                before = await collection.find_one_and_update(
+                    {"_id": ObjectId(id)},
+                    pipeline,
+                    return_document=ReturnDocument.BEFORE
                 )
-                update_dict["stage_history"] = stage_history
-                update_dict["current_stage"] = update_data["current_stage"]
+            except DuplicateKeyError:
+                # The unique email index rejects moving to another lead's email
+                raise DuplicateLeadException(update_data.get("email"))
+            self._invalidate_lead(id)
+            
+            if not before:
+                raise LeadNotFoundException(id)
 
-            # Handle engagement status
-            if "engaged" in update_data:
-                update_dict["engaged"] = update_data["engaged"]
-                update_dict["status"] = "Engaged" if update_data["engaged"] else "Not Engaged"
+            self.invalidate_counts()
+            after, event = self._apply_update(before, set_fields, new_stage=new_stage, now=now)
+            await self.inc_stats(self.stats_delta(added=[after], removed=[before]))
+            if event is None:
+                return Lead.from_document(self._convert_id(after)), None
 
-            # Update timestamps
-            update_dict["updated_at"] = datetime.utcnow()
-            
-            # Perform update with the prepared dictionary
-            result = await collection.find_one_and_update(
-                {"_id": ObjectId(id)},
-                {"$set": update_dict},
-                return_document=True
-            )
-            
-            if result:
-                return Lead(**self._convert_id(result))
-            
-            raise LeadNotFoundException(id)
+            await self._record_stage_events([event])
+            return Lead.from_document(self._convert_id(after)), StageEvent.from_document(event)
             
+        except (LeadNotFoundException, DuplicateLeadException):
+            raise
         except Exception as e:
             logger.error(f"Error updating lead {id}: {str(e)}")
             raise
 
-    def _handle_stage_transition(self, current_lead: Lead, new_stage: str) -> List[Dict]:
-        stage_history = current_lead.stage_history or []
-        
-        if new_stage != current_lead.current_stage:
-            stage_history.append({
-                "from_stage": current_lead.current_stage,
-                "to_stage": new_stage,
-                "changed_at": datetime.utcnow().isoformat(),
-            })
+    def _apply_update(
+        self,
+        before: Dict[str, Any],
+        set_fields: Dict[str, Any],
+        *,
+        new_stage: Optional[str],
+        now: datetime
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        The document _build_update_pipeline turns `before` into, and the
+        stage event to record when it moved the lead to a different stage
+        """
+        after = {**before, **set_fields, "updated_at": now, "version": before.get("version", 0) + 1}
+        if new_stage is not None:
+            after["stage_rank"] = Stage.rank(new_stage)
+        if new_stage is None or before.get("current_stage") == new_stage:
+            return after, None
+
+        after["current_stage"] = new_stage
+        if "stage_updated_at" not in set_fields:
+            after["stage_updated_at"] = now
+        return after, self.build_stage_event(before["_id"], before.get("current_stage"), new_stage, now)
+
+    async def backfill_stage_rank(self) -> int:
+        """
+        Store stage_rank on leads written before it existed, in one
+        server-side update. Returns the number of leads updated.
+        """
+        rank = {
+            "$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$current_stage", stage]}, "then": Stage.rank(stage)}
+                    for stage in Stage.list()
+                ],
+                "default": len(Stage)
+            }
+        }
+        result = await self.get_collection().update_many(
+            {"stage_rank": {"$exists": False}},
+            [{"$set": {"stage_rank": rank}}]
+        )
+        return result.modified_count
+
+    async def update_many(self, ids: List[str], update_data: Dict[str, Any]) -> BulkUpdateResult:
+        """Apply the same update to the leads with the given IDs; see _update_where"""
+        if not ids:
+            return BulkUpdateResult(0, 0, [])
+        return await self._update_where(
+            {"_id": {"$in": [ObjectId(id) for id in ids]}},
+            update_data,
+            track_ids=True
+        )
+
+    async def update_matching(
+        self,
+        update_data: Dict[str, Any],
+        *,
+        search: Optional[str] = None,
+        current_stage: Optional[str] = None,
+        engaged: Optional[bool] = None
+    ) -> BulkUpdateResult:
+        """
+        Apply the same update to every lead matching the given filters; see
+        _update_where. At least one filter is required, so a missing filter
+        can't update every lead.
+        """
+        filter_query = self._build_lead_filter(search=search, current_stage=current_stage, engaged=engaged)
+        if not filter_query:
+            raise ValueError("At least one filter is required to update leads by filter")
+        return await self._update_where(filter_query, update_data)
+
+    async def _update_where(
+        self,
+        filter_query: Dict[str, Any],
+        update_data: Dict[str, Any],
+        *,
+        track_ids: bool = False
+    ) -> BulkUpdateResult:
+        """
+        Apply the same update to every lead matching `filter_query`. Plain
+        field updates run as a single update_many with the filter applied by
+        the server, unless `track_ids` asks for the ids of the updated leads.
+        Otherwise leads are read and written BULK_UPDATE_BATCH_SIZE at a time
+        in _id order, so memory and the size of each write stay bounded
+        however many leads match. Each write is pinned to the filter and to
+        the version that was read, so a lead changed in between is skipped
+        rather than updated from stale data, and stage events, pipeline stats
+        and the returned ids come only from leads that were written. A stage
+        change is recorded in lead_stage_events only for leads not already in
+        the target stage.
+        """
+        try:
+            collection = self.get_collection()
+            new_stage = update_data.get("current_stage")
+            engaged = update_data.get("engaged")
+            now = self.db_time()
+            pipeline = self._build_update_pipeline(
+                self._build_set_fields(update_data),
+                new_stage=new_stage,
+                now=now
+            )
+
+            if not track_ids and new_stage is None and engaged is None:
+                result = await collection.update_many(filter_query, pipeline)
+                # Which leads changed isn't known, so no cached lead can be trusted
+                self._lead_cache.clear()
+                self.invalidate_counts()
+                return BulkUpdateResult(result.matched_count, result.modified_count)
+
+            matched = modified = 0
+            updated_ids: List[str] = []
+            last_id = None
+            while True:
+                batch_filter = filter_query if last_id is None else merge_filters(filter_query, {"_id": {"$gt": last_id}})
+                before = await collection.find(
+                    batch_filter,
+                    {"current_stage": 1, "engaged": 1, "version": 1}
+                ).sort("_id", 1).limit(BULK_UPDATE_BATCH_SIZE).to_list(length=BULK_UPDATE_BATCH_SIZE)
+                if not before:
+                    break
+                last_id = before[-1]["_id"]
+
+                result = await collection.bulk_write([
+                    UpdateOne(merge_filters(filter_query, {"_id": doc["_id"], "version": doc.get("version")}), pipeline)
+                    for doc in before
+                ], ordered=False)
+                for doc in before:
+                    self._invalidate_lead(str(doc["_id"]))
+                self.invalidate_counts()
+                matched += result.matched_count
+                modified += result.modified_count
+
+                written = before
+                if result.matched_count < len(before):
+                    written = await self._written_by_update(before, now)
+                updated_ids.extend(str(doc["_id"]) for doc in written)
+
+                after = [
+                    {
+                        **doc,
+                        "current_stage": new_stage if new_stage is not None else doc.get("current_stage"),
+                        "engaged": engaged if engaged is not None else doc.get("engaged")
+                    }
+                    for doc in written
+                ]
+                await self.inc_stats(self.stats_delta(added=after, removed=written))
+                await self._record_stage_events([
+                    self.build_stage_event(doc["_id"], doc.get("current_stage"), new_stage, now)
+                    for doc in written
+                    if new_stage is not None and doc.get("current_stage") != new_stage
+                ])
+                if len(before) < BULK_UPDATE_BATCH_SIZE:
+                    break
+
+            return BulkUpdateResult(matched, modified, updated_ids)
+
+        except Exception as e:
+            logger.error(f"Error bulk updating leads: {str(e)}")
+            raise
+
+    async def _written_by_update(self, before: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+        """
+        The leads of `before` a version-pinned bulk write at `now` actually
+        updated, found from the version and updated_at it left. A lead
+        written again since is no longer recognisable and is left out; the
+        next stats reconciliation corrects the counters for it.
+        """
+        current = {
+            doc["_id"]: doc
+            for doc in await self.get_collection().find(
+                {"_id": {"$in": [doc["_id"] for doc in before]}},
+                {"version": 1, "updated_at": 1}
+            ).to_list(length=None)
+        }
+        return [
+            doc for doc in before
+            if doc["_id"] in current
+            and current[doc["_id"]].get("version") == (doc.get("version") or 0) + 1
+            and current[doc["_id"]].get("updated_at") == now
+        ]
+
+    def written_fields(self, update_data: Dict[str, Any]) -> List[str]:
+        """Names of the lead fields an update with `update_data` writes"""
+        fields = list(self._build_set_fields(update_data)) + ["updated_at", "version"]
+        if update_data.get("current_stage") is not None:
+            fields += ["current_stage", "stage_updated_at"]
+        return fields
+
+    def _build_set_fields(self, update_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Plain field updates, with status derived from the engaged flag"""
+        set_fields = {}
         
-        return stage_history
+        # Copy basic fields
+        for key, value in update_data.items():
+            if value is not None and key not in ['stage_history', 'current_stage', 'engaged']:
+                set_fields[key] = value
+
+        # Handle engagement status
+        if update_data.get("engaged") is not None:
+            set_fields["engaged"] = update_data["engaged"]
+            set_fields["status"] = "Engaged" if update_data["engaged"] else "Not Engaged"
+
+        return set_fields
+
+    def _build_update_pipeline(
+        self,
+        set_fields: Dict[str, Any],
+        *,
+        new_stage: Optional[str],
+        now: datetime
+    ) -> List[Dict[str, Any]]:
+        """
+        Build an update pipeline that sets `set_fields`, bumps the version and,
+        when the stage actually changes, moves stage_updated_at to `now`
+        unless the update sets it. Expressions in a $set stage all read the
+        document as it was before the update, so $current_stage below is the
+        previous stage.
+        """
+        # Wrap values so strings starting with "$" are not read as field paths
+        set_stage = {key: {"$literal": value} for key, value in set_fields.items()}
+        set_stage["updated_at"] = {"$literal": now}
+        set_stage["version"] = {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+
+        if new_stage is not None:
+            if "stage_updated_at" not in set_fields:
+                set_stage["stage_updated_at"] = {
+                    "$cond": [
+                        {"$ne": ["$current_stage", {"$literal": new_stage}]},
+                        {"$literal": now},
+                        "$stage_updated_at"
+                    ]
+                }
+            set_stage["current_stage"] = {"$literal": new_stage}
+            set_stage["stage_rank"] = {"$literal": Stage.rank(new_stage)}
+
+        return [{"$set": set_stage}]
 
     async def delete(self, lead_id: str) -> Optional[Lead]:
-        """Delete a lead"""
+        """Delete a lead and its stage history"""
         collection = self.get_collection()
         lead_data = await collection.find_one_and_delete(
             {"_id": ObjectId(lead_id)}
         )
+        self._invalidate_lead(lead_id)
         if lead_data:
-            return Lead(**self._convert_id(lead_data))
+            self.invalidate_counts()
+            await self.inc_stats(self.stats_delta(removed=[lead_data]))
+            await self.get_events_collection().delete_many({"lead_id": lead_data["_id"]})
+            return Lead.from_document(self._convert_id(lead_data))
         return None
 
     async def get_count(self, search: Optional[str] = None) -> int:
-        """Get total count of leads, optionally filtered by search"""
-        collection = self.get_collection()
-        filter_query = {}
-        if search:
-            filter_query = {
-                "$or": [
-                    {"name": {"$regex": search, "$options": "i"}},
-                    {"email": {"$regex": search, "$options": "i"}},
-                    {"company": {"$regex": search, "$options": "i"}}
-                ]
-            }
-        return await collection.count_documents(filter_query)
+        """
+        Get the exact count of leads, optionally filtered by search.
+        Counts are cached per filter until the next write or the TTL expires.
+        """
+        filter_query = self._build_search_filter(search)
+        key = self._count_key(filter_query)
+
+        count = self._count_cache.get(key)
+        if count is None:
+            collection = self.get_collection()
+            count = await collection.count_documents(filter_query)
+            self._count_cache.set(key, count)
+        return count
+
+    async def get_total(self, search: Optional[str] = None) -> Tuple[int, bool]:
+        """
+        Get the total to report for a list, and whether it is an estimate.
+        Unfiltered lists use the collection metadata count instead of a scan.
+        """
+        if not search:
+            collection = self.get_collection()
+            return await collection.estimated_document_count(), True
+        return await self.get_count(search), False
+
+    async def get_stats(self) -> PipelineStats:
+        """
+        Get the lead counts per stage and by engagement from the
+        pipeline_stats document, a single read however many leads there are.
+        The counters are built from the leads on first use.
+        """
+        doc = await self.get_stats_collection().find_one({"_id": PIPELINE_STATS_ID})
+        if doc is None:
+            return (await self.reconcile_stats()).stats
+        return self._build_stats(self._flatten_stats(doc), doc.get("updated_at"))
+
+    async def reconcile_stats(self) -> PipelineStatsReconciliation:
+        """
+        Rebuild the pipeline stats from the leads and report how far the
+        stored counters had drifted. Counter updates are not transactional
+        with the lead writes they follow, so a failed or interleaved write
+        can leave them off until the next reconciliation.
+        """
+        try:
+            pipeline = [{"$group": {
+                "_id": {"current_stage": "$current_stage", "engaged": "$engaged"},
+                "count": {"$sum": 1}
+            }}]
+            groups = await self.get_collection().aggregate(pipeline).to_list(length=None)
+            actual = Counter()
+            for group in groups:
+                # Each group is one (stage, engaged) pair, so weight its keys by the count
+                for key, value in self.stats_delta(added=[group["_id"]]).items():
+                    actual[key] += value * group["count"]
+
+            # On the first build there are no stored counters to have drifted
+            stats_collection = self.get_stats_collection()
+            stored_doc = await stats_collection.find_one({"_id": PIPELINE_STATS_ID})
+            drift = {}
+            if stored_doc is not None:
+                stored = self._flatten_stats(stored_doc)
+                drift = {
+                    key: stored[key] - actual[key]
+                    for key in sorted(set(stored) | set(actual))
+                    if stored[key] != actual[key]
+                }
+
+            now = self.db_time()
+            stats = self._build_stats(actual, now)
+            await stats_collection.replace_one(
+                {"_id": PIPELINE_STATS_ID},
+                {**stats.model_dump(), "_id": PIPELINE_STATS_ID},
+                upsert=True
+            )
+            if drift:
+                logger.warning(f"Pipeline stats drifted: {drift}")
+            return PipelineStatsReconciliation(stats=stats, drift=drift)
+
+        except Exception as e:
+            logger.error(f"Error reconciling pipeline stats: {str(e)}")
+            raise
+
+    def stats_delta(self, *, added: Iterable[Dict[str, Any]] = (), removed: Iterable[Dict[str, Any]] = ()) -> Counter:
+        """Change to the pipeline counters from `added` leads appearing and `removed` leads going"""
+        delta = Counter()
+        for docs, sign in ((added, 1), (removed, -1)):
+            for doc in docs:
+                delta["total"] += sign
+                delta[f"stages.{doc.get('current_stage')}"] += sign
+                delta["engaged" if doc.get("engaged") else "not_engaged"] += sign
+        return delta
+
+    async def inc_stats(self, delta: Counter) -> None:
+        """
+        Apply a counter change with one atomic $inc. The lead write has
+        already succeeded, so a failure is logged rather than raised; the
+        next reconciliation corrects the counters. Until the stats are first
+        built, there is nothing to increment.
+        """
+        changes = {key: value for key, value in delta.items() if value}
+        if not changes:
+            return
+        try:
+            await self.get_stats_collection().update_one(
+                {"_id": PIPELINE_STATS_ID},
+                {"$inc": changes, "$currentDate": {"updated_at": True}}
+            )
+        except Exception as e:
+            logger.error(f"Error updating pipeline stats: {str(e)}")
+
+    def _flatten_stats(self, doc: Dict[str, Any]) -> Counter:
+        """Counters of a pipeline_stats document, keyed by their $inc paths"""
+        counters = Counter({key: doc.get(key, 0) for key in ("total", "engaged", "not_engaged")})
+        counters.update({f"stages.{stage}": count for stage, count in (doc.get("stages") or {}).items()})
+        return counters
+
+    def _build_stats(self, counters: Counter, updated_at: Optional[datetime]) -> PipelineStats:
+        stats = PipelineStats(
+            total=counters["total"],
+            engaged=counters["engaged"],
+            not_engaged=counters["not_engaged"],
+            updated_at=updated_at
+        )
+        for key, count in counters.items():
+            if key.startswith("stages."):
+                stats.stages[key[len("stages."):]] = count
+        return stats
+
+    def _count_key(self, filter_query: Dict[str, Any]) -> str:
+        """Normalize a filter document into a cache key"""
+        return json_util.dumps(filter_query, sort_keys=True)
+
+    def invalidate_counts(self) -> None:
+        """Drop cached counts; any write may change which leads match a filter"""
+        self._count_cache.clear()
 
     def _convert_id(self, lead_data: dict) -> dict:
         """Helper method to convert MongoDB _id to string id"""
@@ -228,4 +1085,4 @@ class CRUDLead:
         return lead_data
 
 # Create a global instance
-lead = CRUDLead() 
\ No newline at end of file
+lead = CRUDLead()
@@ -0,0 +1,50 @@
+from typing import Any, Mapping
+from pymongo import monitoring
+from ..core.metrics import FAST_BUCKETS, registry
+
+MONGODB_COMMAND_DURATION = registry.histogram(
+    "mongodb_command_duration_seconds",
+    "Duration of MongoDB commands by command name, as measured by the driver",
+    ("command",),
+    buckets=FAST_BUCKETS
+)
+MONGODB_COMMAND_FAILURES = registry.counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that failed, by command name",
+    ("command",)
+)
+MONGODB_DOCUMENTS_RETURNED = registry.counter(
+    "mongodb_command_documents_returned_total",
+    "Documents returned by MongoDB commands, by command name",
+    ("command",)
+)
+
+
+def returned_documents(reply: Mapping[str, Any]) -> int:
+    """Documents in a command reply: a cursor batch, or the document of a findAndModify"""
+    cursor = reply.get("cursor")
+    if isinstance(cursor, Mapping):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if batch else 0
+    if reply.get("value") is not None:
+        return 1
+    return 0
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Records the duration, failures and returned documents of every MongoDB
+    command. Called from the driver's threads; the metrics lock internally.
+    """
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGODB_COMMAND_DURATION.observe(event.duration_micros / 1e6, command=event.command_name)
+        documents = returned_documents(event.reply)
+        if documents:
+            MONGODB_DOCUMENTS_RETURNED.inc(documents, command=event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGODB_COMMAND_DURATION.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGODB_COMMAND_FAILURES.inc(command=event.command_name)
@@ -1,28 +1,101 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from ..core.config import settings
 from ..core.logging import logger
+from ..core.metrics import registry
+from .commands import CommandMetrics
+from .pool import PoolMetrics
+from .slow_queries import SlowQueryDetector
 
 class Database:
     client: AsyncIOMotorClient = None
     db: AsyncIOMotorDatabase = None
+    slow_queries: SlowQueryDetector = None
+
+    def __init__(self):
+        # Outlives clients so the counters keep adding up across reconnects
+        self.pool_metrics = PoolMetrics()
+        self.command_metrics = CommandMetrics()
+        self._register_pool_metrics()
 
     def connect(self):
-        """Create database connection."""
+        """
+        Create the database connection. The client, and the connection pool
+        it owns, is shared by the whole process, so connecting again is a no-op.
+        """
+        if self.client is not None:
+            return
+        listeners = [self.pool_metrics, self.command_metrics]
+        if settings.SLOW_QUERY_THRESHOLD_MS is not None:
+            self.slow_queries = SlowQueryDetector(
+                settings.SLOW_QUERY_THRESHOLD_MS,
+                sample_rate=settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+                explain_interval=settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+            )
+            listeners.append(self.slow_queries)
         try:
             self.client = AsyncIOMotorClient(
                 settings.MONGODB_URI,
-                serverSelectionTimeoutMS=5000
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=listeners
             )
             self.db = self.client[settings.MONGODB_DATABASE]
+            if self.slow_queries is not None:
+                # Explains run on a background thread, so they use the synchronous client under Motor
+                self.slow_queries.client = self.client.delegate
             logger.info("Connected to MongoDB")
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {str(e)}")
             raise
 
+    async def warm_up(self):
+        """
+        Open the pool's minimum connections before serving requests, so the
+        first requests don't pay for connection setup. The driver keeps the
+        pool at that size afterwards.
+        """
+        count = max(settings.MONGODB_MIN_POOL_SIZE, 1)
+        try:
+            await asyncio.gather(*(self.client.admin.command("ping") for _ in range(count)))
+            logger.info(f"Warmed up MongoDB connection pool: {self.pool_metrics.snapshot()['open']} connections open")
+        except Exception as e:
+            logger.error(f"Failed to warm up MongoDB connection pool: {str(e)}")
+            raise
+
+    def _register_pool_metrics(self):
+        """Export the pool gauges and counters, read from PoolMetrics when scraped"""
+        pool = self.pool_metrics
+        for metric_name, kind, description, attribute in (
+            ("mongodb_pool_connections_open", "gauge", "Open connections in the MongoDB pool", "open"),
+            ("mongodb_pool_connections_in_use", "gauge", "Connections checked out of the MongoDB pool", "in_use"),
+            ("mongodb_pool_checkouts_waiting", "gauge", "Operations waiting for a MongoDB connection", "waiting"),
+            ("mongodb_pool_checkouts_total", "counter", "Successful MongoDB connection checkouts", "checkouts"),
+            ("mongodb_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for MongoDB connections", "checkout_wait_seconds_total"),
+            ("mongodb_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a MongoDB connection", "checkout_wait_seconds_max"),
+            ("mongodb_pool_cleared_total", "counter", "Times the MongoDB pool was cleared, closing its connections", "pools_cleared"),
+        ):
+            registry.callback(metric_name, description, kind, lambda attribute=attribute: getattr(pool, attribute))
+        registry.callback(
+            "mongodb_pool_checkout_failures_total",
+            "Failed MongoDB connection checkouts by reason",
+            "counter",
+            lambda: {(reason,): count for reason, count in pool.snapshot()["checkout_failures"].items()},
+            ("reason",)
+        )
+
     def close(self):
         """Close database connection."""
+        if self.slow_queries is not None:
+            self.slow_queries.close()
+            self.slow_queries = None
         if self.client:
             self.client.close()
+            self.client = None
+            self.db = None
             logger.info("Closed MongoDB connection")
 
 # Create a global instance
@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from ..core.logging import logger
+from ..models.enums import SortField
+
+# Declarative index registry: collection name -> indexes it must have.
+# Every sort field gets a compound index on the field it orders by, with _id
+# as tie-breaker, so both the offset and the keyset list queries are served
+# by an index scan in either direction.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "leads": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        *[
+            IndexModel(
+                [(sort_field.key, ASCENDING), ("_id", ASCENDING)],
+                name=f"{sort_field.key}_id"
+            )
+            for sort_field in SortField
+        ],
+    ],
+    # A lead's history is read in chronological order
+    "lead_stage_events": [
+        IndexModel(
+            [("lead_id", ASCENDING), ("changed_at", ASCENDING), ("_id", ASCENDING)],
+            name="lead_id_changed_at"
+        ),
+    ],
+}
+
+
+@dataclass
+class IndexReport:
+    """Differences between the declared and the existing indexes of a collection"""
+    collection: str
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.extra
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """
+    Create every declared index. Safe to run repeatedly: MongoDB skips indexes
+    that already exist with the same specification.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                # e.g. duplicate emails blocking the unique index; keep
+                # starting up and let verify_indexes report it as missing
+                logger.error(
+                    f"Failed to create index {index.document['name']} "
+                    f"on {collection_name}: {str(e)}"
+                )
+
+
+async def verify_indexes(db: AsyncIOMotorDatabase) -> List[IndexReport]:
+    """Compare existing indexes against the registry, by name, key pattern and uniqueness"""
+    reports = []
+    for collection_name, indexes in INDEXES.items():
+        existing = await db[collection_name].index_information()
+        existing.pop("_id_", None)
+
+        declared = {
+            index.document["name"]: (list(index.document["key"].items()), bool(index.document.get("unique")))
+            for index in indexes
+        }
+        actual = {
+            name: ([tuple(key) for key in info["key"]], bool(info.get("unique")))
+            for name, info in existing.items()
+        }
+
+        report = IndexReport(collection=collection_name)
+        for name, spec in declared.items():
+            if actual.get(name) != spec:
+                report.missing.append(name)
+        report.extra = sorted(name for name in actual if name not in declared)
+        reports.append(report)
+    return reports
+
+
+async def init_indexes(db: AsyncIOMotorDatabase) -> List[IndexReport]:
+    """Apply the index registry and log any drift that remains"""
+    await ensure_indexes(db)
+    reports = await verify_indexes(db)
+    for report in reports:
+        if report.missing:
+            logger.warning(f"Missing indexes on {report.collection}: {', '.join(report.missing)}")
+        if report.extra:
+            logger.warning(f"Unregistered indexes on {report.collection}: {', '.join(report.extra)}")
+        if report.ok:
+            logger.info(f"Indexes on {report.collection} are up to date")
+    return reports
@@ -0,0 +1,86 @@
+import threading
+from typing import Dict, Optional, Union
+from pymongo import monitoring
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool gauges and counters built from pymongo pool events,
+    summed over the pools of every server the client talks to.
+
+    Pool events are published from the driver's threads, so every update
+    takes a lock.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+        self.pools_cleared = 0
+
+    def snapshot(self) -> Dict[str, Union[int, float, Dict[str, int]]]:
+        """Current values, safe to encode as JSON"""
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "checkout_wait_seconds_total": self.checkout_wait_seconds_total,
+                "checkout_wait_seconds_max": self.checkout_wait_seconds_max,
+                "pools_cleared": self.pools_cleared,
+            }
+
+    def _record_wait(self, duration: Optional[float]) -> None:
+        self.waiting -= 1
+        duration = duration or 0.0
+        self.checkout_wait_seconds_total += duration
+        self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, duration)
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        with self._lock:
+            self._record_wait(event.duration)
+            self.checkouts += 1
+            self.in_use += 1
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        with self._lock:
+            self._record_wait(event.duration)
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        with self._lock:
+            self.pools_cleared += 1
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_ready(self, event: monitoring.PoolReadyEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
@@ -0,0 +1,187 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+from bson import json_util
+from pymongo import MongoClient, monitoring
+from ..core.logging import logger
+from ..core.metrics import registry
+
+# Commands that read and can be explained
+MONITORED_COMMANDS = frozenset({"find", "aggregate", "count"})
+
+# Command fields added by the driver rather than the query
+DRIVER_FIELDS = frozenset({
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber",
+    "readConcern", "signature", "apiVersion", "apiStrict", "apiDeprecationErrors",
+})
+
+# Remember at most this many recently explained shapes
+MAX_TRACKED_SHAPES = 1000
+
+SLOW_COMMANDS = registry.counter(
+    "mongodb_slow_commands_total",
+    "Reads slower than the slow query threshold, by command name and collection",
+    ("command", "collection")
+)
+COLLSCANS = registry.counter(
+    "mongodb_slow_collscans_total",
+    "Explained slow reads whose winning plan scans the whole collection",
+    ("collection",)
+)
+
+
+def _shape(value: Any) -> Any:
+    """Replace the values of a filter or pipeline with placeholders, keeping its structure"""
+    if isinstance(value, Mapping):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        # Keep the structure of lists of clauses, such as $or and pipelines
+        if any(isinstance(item, (Mapping, list)) for item in value):
+            return [_shape(item) for item in value]
+        return ["?"]
+    return "?"
+
+
+def query_shape(command: Mapping[str, Any]) -> str:
+    """
+    Identify a read independently of its values: the command, collection,
+    and the shape of its filter or pipeline plus its sort and projection
+    """
+    name = next(iter(command))
+    shape: Dict[str, Any] = {"command": name, "collection": command[name]}
+    for field in ("filter", "query", "pipeline"):
+        if field in command:
+            shape[field] = _shape(command[field])
+    for field in ("sort", "projection"):
+        if field in command:
+            shape[field] = command[field]
+    return json_util.dumps(shape, sort_keys=True)
+
+
+def _walk(value: Any) -> Iterator[Mapping[str, Any]]:
+    """Every document nested in an explain result"""
+    if isinstance(value, Mapping):
+        yield value
+        for item in value.values():
+            yield from _walk(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _walk(item)
+
+
+def _plan_summary(plan: Mapping[str, Any]) -> str:
+    """A winning plan as its chain of stages, e.g. LIMIT > FETCH > IXSCAN(name_id)"""
+    stages = []
+    for node in _walk(plan):
+        stage = node.get("stage")
+        if isinstance(stage, str):
+            stages.append(f"{stage}({node['indexName']})" if "indexName" in node else stage)
+    return " > ".join(stages) or "unknown"
+
+
+def summarize_explain(explain: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Pull the winning plan and execution counters out of an explain result.
+    Aggregations nest these under their stages, so the whole result is
+    searched rather than a fixed path.
+    """
+    plans = [node["winningPlan"] for node in _walk(explain) if "winningPlan" in node]
+    stats = [node for node in _walk(explain) if "totalDocsExamined" in node]
+    collscan = any(node.get("stage") == "COLLSCAN" for plan in plans for node in _walk(plan))
+    return {
+        "plan": " | ".join(_plan_summary(plan) for plan in plans) or "unknown",
+        "docs_examined": sum(node.get("totalDocsExamined", 0) for node in stats),
+        "keys_examined": sum(node.get("totalKeysExamined", 0) for node in stats),
+        "n_returned": sum(node.get("nReturned", 0) for node in stats),
+        "collscan": collscan,
+    }
+
+
+class SlowQueryDetector(monitoring.CommandListener):
+    """
+    Logs find, aggregate and count commands slower than `threshold_ms`
+    with their query shape. A `sample_rate` fraction of them is explained
+    with executionStats on a background thread. The result is logged with
+    the winning plan, documents and keys examined, documents returned,
+    and whether the plan scans the whole collection. Each shape is
+    explained at most once per `explain_interval` seconds.
+
+    Command events are published from the driver's threads, so nothing
+    here touches the event loop. Explains run on the synchronous client
+    underneath Motor's.
+    """
+    def __init__(self, threshold_ms: float, sample_rate: float = 0.1, explain_interval: float = 600.0):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.explain_interval = explain_interval
+        self.client: Optional[MongoClient] = None
+        self._commands: Dict[Tuple[Any, int], Mapping[str, Any]] = {}
+        self._explained_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if event.command_name in MONITORED_COMMANDS:
+            self._commands[(event.connection_id, event.request_id)] = event.command
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        command = self._commands.pop((event.connection_id, event.request_id), None)
+        if command is not None and event.duration_micros / 1000 >= self.threshold_ms:
+            self._report(command, event.database_name, event.duration_micros / 1000)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._commands.pop((event.connection_id, event.request_id), None)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _report(self, command: Mapping[str, Any], database: str, duration_ms: float) -> None:
+        name = next(iter(command))
+        collection = command[name]
+        shape = query_shape(command)
+        SLOW_COMMANDS.inc(command=name, collection=collection)
+        logger.warning(f"Slow {name} on {collection} took {duration_ms:.1f} ms: {shape}")
+
+        if self.client is not None and self._should_explain(shape):
+            self._executor.submit(self._explain, command, database, shape)
+
+    def _should_explain(self, shape: str) -> bool:
+        if random.random() >= self.sample_rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained_at.get(shape)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            if len(self._explained_at) >= MAX_TRACKED_SHAPES:
+                self._explained_at.clear()
+            self._explained_at[shape] = now
+        return True
+
+    def _explain(self, command: Mapping[str, Any], database: str, shape: str) -> None:
+        name = next(iter(command))
+        collection = command[name]
+        pipeline: List[Mapping[str, Any]] = command.get("pipeline") or []
+        if any("$out" in stage or "$merge" in stage for stage in pipeline):
+            # Explaining with executionStats would run the write
+            return
+
+        query = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        try:
+            explain = self.client[database].command({"explain": query, "verbosity": "executionStats"})
+        except Exception as e:
+            logger.error(f"Error explaining slow {name} on {collection}: {str(e)}")
+            return
+
+        summary = summarize_explain(explain)
+        if summary["collscan"]:
+            COLLSCANS.inc(collection=collection)
+        logger.warning(
+            f"Explain of slow {name} on {collection}: plan {summary['plan']}, "
+            f"docsExamined={summary['docs_examined']} keysExamined={summary['keys_examined']} "
+            f"nReturned={summary['n_returned']}"
+            + (" - COLLSCAN" if summary["collscan"] else "")
+            + f" for {shape}"
+        )
@@ -1,21 +1,30 @@
 #here we will initialise the app, create the database connection and add the routes
 from contextlib import asynccontextmanager
 from app.db.database import db
+from app.db.indexes import init_indexes
+from app.websocket.connection import manager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api import api_router
-from app.core.json import CustomJSONEncoder
-from fastapi.encoders import jsonable_encoder
+from app.core.json import ModelJSONResponse
+from app.core.metrics import MetricsMiddleware, registry
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifecycle manager for the FastAPI application.
-    Runs database initialization when the app starts.
+    Owns the MongoDB client: connects and warms up its pool when the app
+    starts, and closes it when the app stops.
     """
     db.connect()
+    await db.warm_up()
+    if settings.MONGODB_ENSURE_INDEXES:
+        await init_indexes(db.db)
+    await manager.start()
     yield
+    await manager.shutdown()
     db.close()
 
 
@@ -25,7 +34,7 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
     lifespan=lifespan,
-    json_encoder=CustomJSONEncoder
+    default_response_class=ModelJSONResponse
 )
 
 # Configure CORS middleware with WebSocket support
@@ -37,13 +46,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-async def startup_db_client():
-    db.connect()
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    db.close()
+# Outermost, so latencies include the other middleware
+app.add_middleware(MetricsMiddleware)
 
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -54,4 +58,18 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.get("/health")
 def health_check():
     """Simple health check endpoint"""
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/health/pool")
+def pool_health():
+    """MongoDB connection pool gauges, for sizing the pool"""
+    return {
+        "max_pool_size": settings.MONGODB_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGODB_MIN_POOL_SIZE,
+        **db.pool_metrics.snapshot()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Request, MongoDB and WebSocket metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -18,6 +18,11 @@ class Stage(str, Enum):
         """Returns list of stage values"""
         return [stage.value for stage in cls]
 
+    @classmethod
+    def rank(cls, stage: str) -> int:
+        """Position of a stage in the pipeline; unknown stages rank after the last one"""
+        return STAGE_RANKS.get(stage, len(STAGE_RANKS))
+
     @classmethod
     def calculate_progress(cls, current_stage: str) -> int:
         """Calculate progress percentage for a given stage"""
@@ -26,6 +31,9 @@ class Stage(str, Enum):
         total_stages = len(stages) - 1
         return round((current_index / total_stages) * 100)
 
+# Pipeline position of each stage, stored on leads as stage_rank
+STAGE_RANKS = {stage.value: index for index, stage in enumerate(Stage)}
+
 
 class SortField(str, Enum):
     """Enum for lead sorting fields"""
@@ -35,8 +43,18 @@ class SortField(str, Enum):
     LAST_CONTACTED = "last_contacted"
     CREATED_AT = "created_at"
 
+    @property
+    def key(self) -> str:
+        """Document field the sort orders on; stages sort by pipeline rank, not name"""
+        return "stage_rank" if self is SortField.CURRENT_STAGE else self.value
+
 
 class EngagementStatus(str, Enum):
     """Enum for lead engagement status"""
     ENGAGED = "Engaged"
-    NOT_ENGAGED = "Not Engaged" 
\ No newline at end of file
+    NOT_ENGAGED = "Not Engaged" 
+
+class ExportFormat(str, Enum):
+    """Enum for lead export file formats"""
+    CSV = "csv"
+    NDJSON = "ndjson"
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Optional, List, Generic, TypeVar
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from typing import Any, Dict, Optional, List, Generic, TypeVar
+from bson import ObjectId
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
 from app.models.enums import Stage, SortField, EngagementStatus
 
 class LeadBase(BaseModel):
@@ -8,6 +9,9 @@ class LeadBase(BaseModel):
     Base Lead model with common attributes
     Used as parent class for other Lead models
     """
+    # Validated stages are kept as their plain string values, as stored
+    model_config = ConfigDict(use_enum_values=True)
+
     name: str = Field(
         ..., 
         min_length=1, 
@@ -33,7 +37,7 @@ class LeadBase(BaseModel):
         default=False,
         description="Whether the lead is currently engaged"
     )
-    current_stage: str = Field(
+    current_stage: Stage = Field(
         default=Stage.NEW_LEAD.value,
         description="Current stage of the lead in the pipeline"
     )
@@ -41,10 +45,6 @@ class LeadBase(BaseModel):
         default=None,
         description="When the current stage was last updated"
     )
-    stage_history: List[dict] = Field(
-        default_factory=list,
-        description="History of stage changes with timestamps"
-    )
     last_contacted: Optional[datetime] = None
 
 class Lead(LeadBase):
@@ -55,13 +55,16 @@ class Lead(LeadBase):
     id: str = Field(description="MongoDB ObjectId as string")
     created_at: datetime
     updated_at: datetime
+    version: int = Field(
+        default=0,
+        description="Incremented on every write; lets clients order change events"
+    )
     
     # Add computed property for stage progress
     @property
     def stage_progress(self) -> dict:
-        stages = Stage.list()
-        current_index = stages.index(self.current_stage)
-        total_stages = len(stages) - 1
+        current_index = Stage.rank(self.current_stage)
+        total_stages = len(Stage) - 1
         return {
             "current_stage": self.current_stage,
             "current_index": current_index,
@@ -71,6 +74,56 @@ class Lead(LeadBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @classmethod
+    def from_document(cls, doc: dict) -> "Lead":
+        """
+        Build a lead from a stored document without re-validating it.
+        Documents are validated on the way in (LeadCreate/LeadUpdate), so
+        reads only need defaults filled in. Documents missing a required
+        field, such as ones written before the field existed, are fully
+        validated instead.
+        """
+        if LEAD_REQUIRED_FIELDS.issubset(doc):
+            return cls.model_construct(**doc)
+        return cls(**doc)
+
+# Fields a stored document must have to be read without validation
+LEAD_REQUIRED_FIELDS = frozenset(name for name, field in Lead.model_fields.items() if field.is_required())
+
+# Lead fields the list endpoint can return with fields=
+LEAD_FIELDS: List[str] = list(Lead.model_fields)
+
+class LeadSummary(BaseModel):
+    """
+    Compact lead returned by the list endpoint by default
+    Holds what the lead table shows; get a lead by ID for everything else
+    """
+    id: str
+    name: str
+    email: str
+    company: str
+    status: str
+    engaged: bool
+    current_stage: str
+    last_contacted: Optional[datetime] = None
+
+LEAD_SUMMARY_FIELDS: List[str] = list(LeadSummary.model_fields)
+
+# Scalar lead fields that can be exported, in default column order
+EXPORT_FIELDS: List[str] = [
+    "id",
+    "name",
+    "email",
+    "company",
+    "status",
+    "engaged",
+    "current_stage",
+    "stage_updated_at",
+    "last_contacted",
+    "created_at",
+    "updated_at",
+]
+
 class LeadCreate(LeadBase):
     """
     Model for creating new leads
@@ -78,18 +131,113 @@ class LeadCreate(LeadBase):
     """
     pass
 
+class LeadBulkCreate(BaseModel):
+    """
+    Model for creating a batch of leads in one request
+    """
+    leads: List[LeadCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=10000,
+        description="Leads to create"
+    )
+
+class LeadBulkCreateResponse(BaseModel):
+    """
+    Result of a bulk lead creation
+    """
+    created: int = Field(description="Number of leads inserted")
+    ids: List[str] = Field(description="IDs of the inserted leads, in request order")
+    duplicates: List[str] = Field(
+        default_factory=list,
+        description="Emails skipped because a lead with that email already exists"
+    )
+
 class LeadUpdate(BaseModel):
     """
     Model for updating existing leads
     All fields are optional
     """
-    name: Optional[str] = None
+    model_config = ConfigDict(use_enum_values=True)
+
+    # Same limits as LeadBase, since stored leads are read back unvalidated
+    name: Optional[str] = Field(default=None, min_length=1, max_length=100)
     email: Optional[EmailStr] = None
-    company: Optional[str] = None
-    current_stage: Optional[str] = None
+    company: Optional[str] = Field(default=None, min_length=1, max_length=100)
+    current_stage: Optional[Stage] = None
     engaged: Optional[bool] = None
     last_contacted: Optional[datetime] = None
-    status: Optional[str] = None
+    status: Optional[str] = Field(default=None, max_length=50)
+    stage_updated_at: Optional[datetime] = None
+
+class LeadFilter(BaseModel):
+    """
+    Model for selecting leads by search term, stage and engagement
+    """
+    search: Optional[str] = Field(default=None, min_length=1)
+    current_stage: Optional[Stage] = None
+    engaged: Optional[bool] = None
+
+class LeadBulkUpdate(BaseModel):
+    """
+    Model for applying one update to many leads
+    Select leads by ids or by filter; change fields with patch, move them with stage
+    """
+    ids: Optional[List[str]] = Field(default=None, min_length=1, max_length=10000)
+    filter: Optional[LeadFilter] = None
+    patch: Optional[LeadUpdate] = None
+    stage: Optional[Stage] = Field(
+        default=None,
+        description="Target stage; appended to the stage history of leads not already in it"
+    )
+
+    @model_validator(mode="after")
+    def check_selection_and_changes(self) -> "LeadBulkUpdate":
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of ids or filter")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("filter must set at least one of search, current_stage or engaged")
+        if self.ids and not all(ObjectId.is_valid(id) for id in self.ids):
+            raise ValueError("ids must be valid lead IDs")
+        if self.patch is None and self.stage is None:
+            raise ValueError("Provide a patch, a stage, or both")
+        if self.patch is not None and self.patch.email is not None:
+            raise ValueError("email cannot be bulk updated")
+        return self
+
+    def update_data(self) -> dict:
+        """Flatten patch and stage into the update dictionary CRUDLead expects"""
+        update_data = self.patch.model_dump(exclude_none=True) if self.patch else {}
+        if self.stage is not None:
+            update_data["current_stage"] = self.stage.value
+        return update_data
+
+class LeadBulkUpdateResponse(BaseModel):
+    """
+    Result of a bulk lead update
+    """
+    matched: int = Field(description="Number of leads selected")
+    modified: int = Field(description="Number of leads actually changed")
+    ids: Optional[List[str]] = Field(
+        default=None,
+        description="IDs of the leads updated when selected by ids; null for filter updates"
+    )
+
+class LeadSubscription(BaseModel):
+    """
+    Changes a WebSocket client wants to receive
+    Every given criterion must match; an empty subscription receives everything
+    """
+    model_config = ConfigDict(populate_by_name=True)
+
+    stages: Optional[List[Stage]] = Field(default=None, min_length=1)
+    engaged: Optional[bool] = None
+    search: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        description="Case-insensitive text matched as a substring of name, email and company"
+    )
+    lead_ids: Optional[List[str]] = Field(default=None, alias="leadIds", min_length=1, max_length=10000)
 
 class StageChange(BaseModel):
     """
@@ -100,6 +248,50 @@ class StageChange(BaseModel):
     changed_at: datetime = Field(default_factory=datetime.utcnow)
     notes: Optional[str] = None
 
+class StageEvent(BaseModel):
+    """
+    A stage transition of a lead, stored in the lead_stage_events collection
+    """
+    id: str = Field(description="MongoDB ObjectId as string")
+    lead_id: str
+    from_stage: Optional[str] = None
+    to_stage: str
+    changed_at: Optional[datetime] = None
+    notes: Optional[str] = None
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "StageEvent":
+        """Build an event from a stored document without re-validating it"""
+        return cls.model_construct(**{
+            **doc,
+            "id": str(doc["_id"]),
+            "lead_id": str(doc["lead_id"])
+        })
+
+class PipelineStats(BaseModel):
+    """
+    Lead counts per stage and by engagement, kept up to date by every lead
+    write so they can be read without scanning the leads
+    """
+    total: int = 0
+    stages: Dict[str, int] = Field(
+        default_factory=lambda: {stage: 0 for stage in Stage.list()},
+        description="Number of leads in each stage"
+    )
+    engaged: int = 0
+    not_engaged: int = 0
+    updated_at: Optional[datetime] = None
+
+class PipelineStatsReconciliation(BaseModel):
+    """
+    Result of rebuilding the pipeline stats from the leads
+    """
+    stats: PipelineStats = Field(description="Counters rebuilt from the leads")
+    drift: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Stored minus actual value of every counter that was off"
+    )
+
 # Add this new model for paginated response
 T = TypeVar('T')
 
@@ -109,12 +301,36 @@ class PaginatedResponse(BaseModel, Generic[T]):
     """
     items: List[T]
     total: int
-    page: int
+    total_estimated: bool = Field(
+        default=False,
+        description="Whether total comes from collection metadata rather than an exact count"
+    )
+    page: Optional[int] = Field(
+        default=None,
+        description="Page number; null when paginating by cursor"
+    )
     page_size: int
     total_pages: int
+    next_cursor: Optional[str] = Field(
+        default=None,
+        description="Opaque cursor for the next page; null on the last page"
+    )
 
 class LeadPaginatedResponse(PaginatedResponse[Lead]):
     """
     Paginated response specifically for leads
     """
+    pass
+
+class StageEventPaginatedResponse(PaginatedResponse[StageEvent]):
+    """
+    Paginated stage history of a lead, oldest first
+    """
+    pass
+
+class LeadListResponse(PaginatedResponse[Dict[str, Any]]):
+    """
+    Paginated lead list whose items hold only the selected fields,
+    those of LeadSummary by default
+    """
     pass 
\ No newline at end of file
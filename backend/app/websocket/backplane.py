@@ -0,0 +1,154 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Set
+from uuid import uuid4
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.database import get_database
+
+# Receives every encoded message published by other subscribers
+MessageHandler = Callable[[str], None]
+
+
+class Backplane(ABC):
+    """
+    Relays broadcast messages between connection managers, typically one per
+    worker process, so a change made through any worker reaches every client.
+    Subscribers never receive their own messages back; they deliver those
+    locally.
+    """
+
+    @abstractmethod
+    async def subscribe(self, handler: MessageHandler) -> str:
+        """Register a handler and return the subscriber id to publish with"""
+
+    @abstractmethod
+    async def publish(self, message: str, sender: str) -> None:
+        """Deliver an encoded message to every subscriber except `sender`"""
+
+    async def close(self) -> None:
+        """Stop delivering messages"""
+
+
+class InMemoryBackplane(Backplane):
+    """
+    Backplane for a single process. Managers sharing one instance behave like
+    workers sharing a real backplane, which is what the tests rely on.
+    """
+    def __init__(self):
+        self._handlers: Dict[str, MessageHandler] = {}
+
+    async def subscribe(self, handler: MessageHandler) -> str:
+        subscriber_id = uuid4().hex
+        self._handlers[subscriber_id] = handler
+        return subscriber_id
+
+    async def publish(self, message: str, sender: str) -> None:
+        for subscriber_id, handler in list(self._handlers.items()):
+            if subscriber_id != sender:
+                handler(message)
+
+    async def close(self) -> None:
+        self._handlers.clear()
+
+
+class MongoBackplane(Backplane):
+    """
+    Backplane over a capped MongoDB collection. Publishing inserts a document;
+    each subscriber follows the collection with a tailable cursor. Works on
+    standalone servers, unlike change streams, which need a replica set.
+    """
+    def __init__(
+        self,
+        database: Optional[AsyncIOMotorDatabase] = None,
+        collection_name: str = settings.BROADCAST_COLLECTION,
+        size_bytes: int = settings.BROADCAST_COLLECTION_SIZE_BYTES,
+        retry_interval: float = 1.0
+    ):
+        self.database = database
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.retry_interval = retry_interval
+        self._tasks: Set[asyncio.Task] = set()
+
+    def get_collection(self) -> AsyncIOMotorCollection:
+        if self.database is None:
+            self.database = get_database()
+        return self.database[self.collection_name]
+
+    async def subscribe(self, handler: MessageHandler) -> str:
+        await self._ensure_collection()
+        subscriber_id = uuid4().hex
+        task = asyncio.create_task(self._tail(subscriber_id, handler, await self._latest_id()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return subscriber_id
+
+    async def publish(self, message: str, sender: str) -> None:
+        await self.get_collection().insert_one({"sender": sender, "message": message})
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _ensure_collection(self) -> None:
+        try:
+            await self.get_collection().database.create_collection(
+                self.collection_name,
+                capped=True,
+                size=self.size_bytes
+            )
+        except CollectionInvalid:
+            # Already exists
+            pass
+
+    async def _latest_id(self) -> Optional[ObjectId]:
+        cursor = self.get_collection().find({}, {"_id": 1}).sort("$natural", -1).limit(1)
+        docs = await cursor.to_list(length=1)
+        return docs[0]["_id"] if docs else None
+
+    async def _tail(self, subscriber_id: str, handler: MessageHandler, last_id: Optional[ObjectId]) -> None:
+        """
+        Follow the collection in insertion order, starting after `last_id`.
+        _ids are generated by each publishing process and are not ordered
+        across processes, so a new cursor resumes by walking the collection
+        in natural order up to the last message seen.
+        """
+        collection = self.get_collection()
+        while True:
+            try:
+                cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                skipping = last_id is not None
+                while cursor.alive:
+                    async for doc in cursor:
+                        if skipping:
+                            skipping = doc["_id"] != last_id
+                            continue
+                        last_id = doc["_id"]
+                        if doc.get("sender") != subscriber_id:
+                            handler(doc["message"])
+
+                    if skipping:
+                        # The resume point was overwritten by newer messages
+                        logger.warning("Broadcast backplane fell behind; some messages were missed")
+                        skipping = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Broadcast backplane error: {str(e)}")
+
+            # Tailable cursors die on an empty collection or when overrun
+            await asyncio.sleep(self.retry_interval)
+
+
+def create_backplane() -> Backplane:
+    """Build the backplane selected by settings"""
+    if settings.BROADCAST_BACKPLANE == "mongodb":
+        return MongoBackplane()
+    return InMemoryBackplane()
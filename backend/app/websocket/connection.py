@@ -1,40 +1,345 @@
-from fastapi import WebSocket
-from typing import Dict, Set
+import asyncio
+import itertools
 import json
-from app.models.lead import Lead
+import time
+from collections import OrderedDict
+from fastapi import WebSocket, status
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.models.lead import Lead, LeadSubscription
+from app.core.config import settings
 from app.core.json import json_dumps
+from app.core.logging import logger
+from app.core.metrics import FAST_BUCKETS, registry
+from app.websocket.backplane import Backplane, create_backplane
+from app.websocket.subscriptions import ChangeScope, Subscription, SubscriptionIndex
+
+# A change message together with the scope used to route it
+Event = Tuple[dict, ChangeScope]
+
+WEBSOCKET_CONNECTIONS = registry.gauge(
+    "websocket_connections",
+    "Connected WebSocket clients"
+)
+WEBSOCKET_MESSAGES_SENT = registry.counter(
+    "websocket_messages_sent_total",
+    "Frames sent to WebSocket clients"
+)
+WEBSOCKET_SEND_FAILURES = registry.counter(
+    "websocket_send_failures_total",
+    "Frames not delivered to WebSocket clients, by reason",
+    ("reason",)
+)
+WEBSOCKET_BROADCAST_DURATION = registry.histogram(
+    "websocket_broadcast_duration_seconds",
+    "Time to encode a batch of changes, queue it for local clients and publish it to the backplane",
+    buckets=FAST_BUCKETS
+)
+
+class ClientConnection:
+    """A connected client with its own bounded send queue and writer task"""
+    def __init__(self, client_id: str, websocket: WebSocket, queue_size: int):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.dropped = 0
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+    """
+    Fans messages out to connected clients without waiting on them.
+    Broadcasting only enqueues; each client's writer task drains its own queue,
+    so a slow client delays nobody but itself. When a client's queue is full,
+    the slow consumer policy either disconnects it or drops its oldest message.
+
+    Changes arriving within the coalescing window are merged per lead and
+    sent as one frame. Each client only receives the changes matching its
+    subscription. Changes are also published to the backplane, which relays
+    them to the managers of other worker processes.
+    """
+    def __init__(
+        self,
+        queue_size: int = settings.WS_SEND_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT_SECONDS,
+        slow_consumer_policy: str = settings.WS_SLOW_CONSUMER_POLICY,
+        backplane: Optional[Backplane] = None,
+        coalesce_window: float = settings.WS_COALESCE_WINDOW_MS / 1000
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.backplane = backplane
+        self.coalesce_window = coalesce_window
+        self.active_connections: Dict[str, ClientConnection] = {}
+        self.subscriptions = SubscriptionIndex()
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._subscriber_id: Optional[str] = None
+        self._pending: "OrderedDict[str, Event]" = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._event_ids = itertools.count()
+
+    async def start(self):
+        """Start receiving messages published by other workers"""
+        if self.backplane is not None and self._subscriber_id is None:
+            self._subscriber_id = await self.backplane.subscribe(self._receive)
 
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
-        self.active_connections[client_id] = websocket
 
-    def disconnect(self, client_id: str):
+        # A reconnecting client replaces its previous connection
+        previous = self.active_connections.get(client_id)
+        if previous:
+            self._drop(previous, status.WS_1000_NORMAL_CLOSURE)
+
+        connection = ClientConnection(client_id, websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self.active_connections[client_id] = connection
+        WEBSOCKET_CONNECTIONS.inc()
+        # Until the client subscribes, it receives everything
+        self.subscriptions.set(client_id, Subscription())
+
+    def subscribe(self, client_id: str, subscription: LeadSubscription):
+        """Replace the changes a connected client receives"""
         if client_id in self.active_connections:
-            del self.active_connections[client_id]
+            self.subscriptions.set(client_id, Subscription.from_model(subscription))
+
+    def disconnect(self, client_id: str, websocket: Optional[WebSocket] = None):
+        """Forget a client; with `websocket`, only if it is still the client's current socket"""
+        connection = self.active_connections.get(client_id)
+        if connection is None:
+            return
+        if websocket is not None and connection.websocket is not websocket:
+            return
+
+        del self.active_connections[client_id]
+        WEBSOCKET_CONNECTIONS.dec()
+        self.subscriptions.remove(client_id)
+        if connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
 
-    async def broadcast_lead_change(self, lead: Lead, change_type: str, user_id: str):
+    async def broadcast_lead_change(
+        self,
+        lead: Lead,
+        change_type: str,
+        user_id: str,
+        changed_fields: Optional[Iterable[str]] = None,
+        previous_stage: Optional[str] = None
+    ):
+        """
+        Announce a change to one lead. Updates that name their
+        `changed_fields` carry only those fields; creates carry the whole lead
+        and deletes just enough to identify it. Updates that moved the lead
+        pass the `previous_stage` it left, so clients following that stage
+        see it go.
+        """
         message = {
             "type": change_type,
-            "lead": lead.dict(),
+            "id": lead.id,
+            "version": lead.version,
             "userId": user_id,
             "isRemote": True
         }
-        
-        # Use custom JSON encoder for datetime objects
-        json_message = json_dumps(message)
-        
-        # Broadcast to all connected clients
-        for client_id, connection in self.active_connections.items():
+        if change_type == "update" and changed_fields is not None:
+            message["changes"] = lead.model_dump(include=set(changed_fields))
+        elif change_type == "delete":
+            message["lead"] = {"id": lead.id, "name": lead.name}
+        else:
+            message["lead"] = lead.model_dump()
+        await self._broadcast(message, ChangeScope.for_lead(lead, changed_fields, previous_stage))
+
+    async def broadcast_bulk_change(
+        self,
+        lead_ids: Optional[List[str]],
+        change_type: str,
+        user_id: str,
+        count: Optional[int] = None
+    ):
+        """
+        Send a single message covering every lead touched by a bulk operation.
+        Operations selecting leads by filter pass no `lead_ids`, only the
+        `count`; the message then reaches every client.
+        """
+        message = {
+            "type": f"bulk_{change_type}",
+            "count": count if count is not None else len(lead_ids),
+            "userId": user_id,
+            "isRemote": True
+        }
+        if lead_ids is not None:
+            message["leadIds"] = lead_ids
+        await self._broadcast(message, ChangeScope(lead_ids=list(lead_ids) if lead_ids is not None else None))
+
+    async def shutdown(self):
+        """Send pending changes, then stop every writer task and close every connection"""
+        await self.flush()
+        if self.backplane is not None:
+            await self.backplane.close()
+            self._subscriber_id = None
+        for connection in list(self.active_connections.values()):
+            self._drop(connection, status.WS_1001_GOING_AWAY)
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+    async def flush(self):
+        """Send every change waiting in the coalescing window now"""
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        events = list(self._pending.values())
+        self._pending.clear()
+        if events:
+            await self._send_frame(events)
+
+    async def _broadcast(self, message: dict, scope: ChangeScope):
+        if self.coalesce_window <= 0:
+            await self._send_frame([(message, scope)])
+            return
+
+        # Hold changes briefly so bursts go out as one frame
+        self._queue_event(message, scope)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.coalesce_window)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing broadcasts: {str(e)}")
+
+    def _queue_event(self, message: dict, scope: ChangeScope):
+        """Add a change to the window, merging it with a pending change to the same lead"""
+        key = message.get("id") or f"bulk-{next(self._event_ids)}"
+        previous = self._pending.get(key)
+        if previous is None:
+            self._pending[key] = (message, scope)
+        else:
+            previous_message, previous_scope = previous
+            self._pending[key] = (self._merge_events(previous_message, message), previous_scope.merge(scope))
+
+    @staticmethod
+    def _merge_events(previous: dict, current: dict) -> dict:
+        """Combine two changes to the same lead into one equivalent change"""
+        if current["type"] != "update" or previous["type"] == "delete":
+            # A delete or create supersedes whatever came before
+            return current
+        if "lead" in current:
+            # A full snapshot supersedes earlier changes but keeps a pending create a create
+            return {**current, "type": previous["type"]}
+        if "lead" in previous:
+            # Fold the delta into the earlier full snapshot
+            return {
+                **previous,
+                "lead": {**previous["lead"], **current["changes"]},
+                "version": current["version"],
+                "userId": current["userId"]
+            }
+        return {**current, "changes": {**previous["changes"], **current["changes"]}}
+
+    async def _send_frame(self, events: List[Event]):
+        """Encode a batch of events once and deliver it everywhere"""
+        start = time.perf_counter()
+        try:
+            await self._deliver(events)
+        finally:
+            WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start)
+
+    async def _deliver(self, events: List[Event]):
+        encoded = [json_dumps(message) for message, _ in events]
+        scopes = [scope for _, scope in events]
+        self._fan_out(scopes, encoded)
+
+        if self._subscriber_id is not None:
+            payload = json_dumps({"scopes": [scope.to_dict() for scope in scopes], "events": encoded})
+            try:
+                await self.backplane.publish(payload, self._subscriber_id)
+            except Exception as e:
+                # Local clients already have it; don't fail the request
+                logger.error(f"Error publishing broadcast to backplane: {str(e)}")
+
+    def _receive(self, payload: str):
+        """Deliver events published by another worker"""
+        try:
+            data = json.loads(payload)
+            scopes = [ChangeScope.from_dict(scope) for scope in data["scopes"]]
+            events = data["events"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed backplane message: {str(e)}")
+            return
+        self._fan_out(scopes, events)
+
+    def _fan_out(self, scopes: List[ChangeScope], encoded: List[str]):
+        """Queue, for every client of this worker, a frame of the events it subscribed to"""
+        selected: Dict[str, List[int]] = {}
+        for index, scope in enumerate(scopes):
+            for client_id in self.subscriptions.match(scope):
+                selected.setdefault(client_id, []).append(index)
+
+        # Clients selecting the same events share one frame
+        frames: Dict[Tuple[int, ...], str] = {}
+        for client_id, indexes in selected.items():
+            connection = self.active_connections.get(client_id)
+            if connection is None:
+                # Evicted while enqueueing to another client
+                continue
+            key = tuple(indexes)
+            if key not in frames:
+                frames[key] = self._build_frame([encoded[index] for index in indexes])
+            self._enqueue(connection, frames[key])
+
+    @staticmethod
+    def _build_frame(encoded: List[str]) -> str:
+        if len(encoded) == 1:
+            return encoded[0]
+        return '{"type":"batch","events":[' + ",".join(encoded) + "]}"
+
+    def _enqueue(self, connection: ClientConnection, message: str):
+        try:
+            connection.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == "drop_oldest":
+            connection.queue.get_nowait()
+            connection.queue.put_nowait(message)
+            connection.dropped += 1
+            WEBSOCKET_SEND_FAILURES.inc(reason="dropped")
+        else:
+            WEBSOCKET_SEND_FAILURES.inc(reason="queue_full")
+            logger.warning(f"Disconnecting slow WebSocket client {connection.client_id}: send queue full")
+            self._drop(connection, status.WS_1013_TRY_AGAIN_LATER)
+
+    async def _writer(self, connection: ClientConnection):
+        """Drain one client's queue, one message at a time"""
+        while True:
+            message = await connection.queue.get()
             try:
-                await connection.send_text(json_message)
+                await asyncio.wait_for(
+                    connection.websocket.send_text(message),
+                    timeout=self.send_timeout
+                )
+                WEBSOCKET_MESSAGES_SENT.inc()
             except Exception as e:
-                print(f"Error sending to client {client_id}: {str(e)}")
+                WEBSOCKET_SEND_FAILURES.inc(reason="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+                logger.warning(f"Error sending to client {connection.client_id}: {str(e) or type(e).__name__}")
                 # Remove failed connection
-                self.disconnect(client_id)
+                self._drop(connection, status.WS_1011_INTERNAL_ERROR)
+                return
+
+    def _drop(self, connection: ClientConnection, code: int):
+        """Disconnect a client and close its socket in the background"""
+        self.disconnect(connection.client_id, connection.websocket)
+        task = asyncio.create_task(self._close(connection.websocket, code))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=self.send_timeout)
+        except Exception:
+            # The socket is already gone
+            pass
 
 # Create a singleton instance
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager(backplane=create_backplane())
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+from app.models.lead import Lead, LeadSubscription
+
+# Lead fields a subscription's search is matched against
+SEARCH_FIELDS = ("name", "email", "company")
+
+
+@dataclass
+class ChangeScope:
+    """
+    What a subscription needs to know about a change to decide whether to
+    deliver it. Besides the lead's state after the change, the scope includes
+    any state the change moved it out of, so clients also hear about leads
+    leaving their view. None means unknown, which matches any criterion.
+    """
+    lead_ids: Optional[List[str]]
+    stages: Optional[Set[str]] = None
+    engaged: Optional[Set[bool]] = None
+    texts: Optional[List[str]] = None
+
+    @classmethod
+    def for_lead(
+        cls,
+        lead: Lead,
+        changed_fields: Optional[Iterable[str]] = None,
+        previous_stage: Optional[str] = None
+    ) -> "ChangeScope":
+        """
+        Scope of a change to one lead that wrote `changed_fields` (None for all)
+        and, if it moved the lead, left `previous_stage`
+        """
+        changed = set(changed_fields) if changed_fields is not None else set()
+        stages = {lead.current_stage}
+        if "current_stage" in changed and previous_stage:
+            stages.add(previous_stage)
+
+        engaged = {True, False} if "engaged" in changed else {lead.engaged}
+
+        # Previous text values are not known, so a text change matches any search
+        texts = None if changed.intersection(SEARCH_FIELDS) else [getattr(lead, name) for name in SEARCH_FIELDS]
+        return cls(lead_ids=[lead.id], stages=stages, engaged=engaged, texts=texts)
+
+    def merge(self, other: "ChangeScope") -> "ChangeScope":
+        """Scope covering both this change and `other`"""
+        return ChangeScope(
+            lead_ids=(
+                None if self.lead_ids is None or other.lead_ids is None
+                else list(dict.fromkeys(self.lead_ids + other.lead_ids))
+            ),
+            stages=None if self.stages is None or other.stages is None else self.stages | other.stages,
+            engaged=None if self.engaged is None or other.engaged is None else self.engaged | other.engaged,
+            texts=None if self.texts is None or other.texts is None else self.texts + other.texts
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "lead_ids": self.lead_ids,
+            "stages": sorted(self.stages) if self.stages is not None else None,
+            "engaged": sorted(self.engaged) if self.engaged is not None else None,
+            "texts": self.texts
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChangeScope":
+        return cls(
+            lead_ids=data.get("lead_ids"),
+            stages=set(data["stages"]) if data.get("stages") is not None else None,
+            engaged=set(data["engaged"]) if data.get("engaged") is not None else None,
+            texts=data.get("texts")
+        )
+
+
+@dataclass
+class Subscription:
+    """A client's subscription, prepared for matching"""
+    stages: Optional[Set[str]] = None
+    engaged: Optional[bool] = None
+    search: Optional[str] = None
+    lead_ids: Optional[Set[str]] = None
+
+    @classmethod
+    def from_model(cls, subscription: LeadSubscription) -> "Subscription":
+        return cls(
+            stages={stage.value for stage in subscription.stages} if subscription.stages else None,
+            engaged=subscription.engaged,
+            # Matched as a plain substring: compiling client input as a regex
+            # would let one subscription stall the event loop on every change
+            search=subscription.search.lower() if subscription.search else None,
+            lead_ids=set(subscription.lead_ids) if subscription.lead_ids else None
+        )
+
+    def matches(self, scope: ChangeScope) -> bool:
+        if self.lead_ids is not None and scope.lead_ids is not None and self.lead_ids.isdisjoint(scope.lead_ids):
+            return False
+        if self.stages is not None and scope.stages is not None and self.stages.isdisjoint(scope.stages):
+            return False
+        if self.engaged is not None and scope.engaged is not None and self.engaged not in scope.engaged:
+            return False
+        if self.search is not None and scope.texts is not None:
+            return any(text and self.search in text.lower() for text in scope.texts)
+        return True
+
+
+class SubscriptionIndex:
+    """
+    Subscriptions of every client, indexed so a change only has to be checked
+    against clients that could want it. Clients following specific leads are
+    indexed by lead id, clients following stages by stage, and the rest are
+    checked for every change.
+    """
+    def __init__(self):
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._by_lead: Dict[str, Set[str]] = {}
+        self._by_stage: Dict[str, Set[str]] = {}
+        self._unindexed: Set[str] = set()
+
+    def set(self, client_id: str, subscription: Subscription) -> None:
+        """Replace a client's subscription"""
+        self.remove(client_id)
+        self._subscriptions[client_id] = subscription
+        if subscription.lead_ids is not None:
+            for lead_id in subscription.lead_ids:
+                self._by_lead.setdefault(lead_id, set()).add(client_id)
+        elif subscription.stages is not None:
+            for stage in subscription.stages:
+                self._by_stage.setdefault(stage, set()).add(client_id)
+        else:
+            self._unindexed.add(client_id)
+
+    def remove(self, client_id: str) -> None:
+        subscription = self._subscriptions.pop(client_id, None)
+        if subscription is None:
+            return
+        self._unindexed.discard(client_id)
+        for key, index in ((subscription.lead_ids, self._by_lead), (subscription.stages, self._by_stage)):
+            for value in key or ():
+                clients = index.get(value)
+                if clients is not None:
+                    clients.discard(client_id)
+                    if not clients:
+                        del index[value]
+
+    def match(self, scope: ChangeScope) -> Set[str]:
+        """Ids of the clients whose subscription matches a change"""
+        candidates = set(self._unindexed)
+        if scope.lead_ids is None:
+            candidates.update(*self._by_lead.values())
+        else:
+            for lead_id in scope.lead_ids:
+                candidates.update(self._by_lead.get(lead_id, ()))
+        if scope.stages is None:
+            candidates.update(*self._by_stage.values())
+        else:
+            for stage in scope.stages:
+                candidates.update(self._by_stage.get(stage, ()))
+        return {client_id for client_id in candidates if self._subscriptions[client_id].matches(scope)}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
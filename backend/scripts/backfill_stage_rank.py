@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(backend_dir)
+
+import asyncio
+from datetime import datetime
+from app.crud.lead import lead
+
+async def main():
+    """
+    Store stage_rank on leads created before it existed, so sorting by
+    stage sees them in pipeline order. Safe to run more than once.
+    """
+    start_time = datetime.now()
+    updated = await lead.backfill_stage_rank()
+    elapsed_time = datetime.now() - start_time
+    print(f"Set stage_rank on {updated} leads in {elapsed_time.total_seconds():.2f} seconds")
+
+if __name__ == "__main__":
+    asyncio.run(main())
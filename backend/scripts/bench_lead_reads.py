@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(backend_dir)
+
+import argparse
+import timeit
+from typing import Any, Dict, List
+from bson import ObjectId
+from app.core.json import ModelJSONResponse
+from app.models.lead import Lead, LeadPaginatedResponse
+from scripts.bench_serialization import build_leads
+
+def build_documents(count: int) -> List[Dict[str, Any]]:
+    """Documents as the driver returns them, with an ObjectId _id"""
+    docs = []
+    for lead in build_leads(count):
+        doc = lead.model_dump()
+        doc["_id"] = ObjectId(doc.pop("id"))
+        docs.append(doc)
+    return docs
+
+def convert_id(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc = dict(doc)
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CPU per list request with validated and trusted lead reads")
+    parser.add_argument("--page-size", type=int, default=100, help="Leads per list response")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds; the best is reported")
+    parser.add_argument("--number", type=int, default=200, help="Requests per round")
+    args = parser.parse_args()
+
+    docs = build_documents(args.page_size)
+
+    def list_request(build) -> bytes:
+        # Everything a list request does after the query: build the leads, encode the page
+        items = [build(convert_id(doc)) for doc in docs]
+        page = LeadPaginatedResponse(
+            items=items,
+            total=len(items),
+            page=1,
+            page_size=args.page_size,
+            total_pages=1
+        )
+        return ModelJSONResponse(page).body
+
+    validated = lambda: list_request(lambda doc: Lead(**doc))
+    trusted = lambda: list_request(Lead.from_document)
+    assert validated() == trusted()
+
+    print(f"List request CPU after the query ({args.page_size} leads)")
+    results = {}
+    for label, func in (("validated: Lead(**doc)", validated), ("trusted: Lead.from_document", trusted)):
+        best = min(timeit.repeat(func, repeat=args.repeat, number=args.number)) / args.number
+        results[label] = best
+        print(f"  {label:<30} {best * 1e3:8.3f} ms/request  {best / len(docs) * 1e6:8.2f} us/lead")
+
+    before, after = results.values()
+    print(f"  speedup {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
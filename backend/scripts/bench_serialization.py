@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(backend_dir)
+
+import argparse
+import json
+import timeit
+import warnings
+from datetime import datetime, timedelta
+from typing import Callable, List
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.core.json import ModelJSONResponse, json_dumps
+from app.models.enums import Stage
+from app.models.lead import Lead, LeadPaginatedResponse
+
+class LegacyJSONEncoder(json.JSONEncoder):
+    """The stdlib encoder broadcasts used before, kept as the baseline"""
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+def build_leads(count: int) -> List[Lead]:
+    """Leads shaped like real documents, spread across the stages"""
+    now = datetime.utcnow()
+    stages = list(Stage)
+    leads = []
+    for i in range(count):
+        stage_index = i % len(stages)
+        leads.append(Lead(
+            id=str(ObjectId()),
+            name=f"Lead {i}",
+            email=f"lead{i}@example.com",
+            company=f"Company {i % 50}",
+            engaged=i % 2 == 0,
+            current_stage=stages[stage_index].value,
+            last_contacted=now - timedelta(days=i % 30),
+            stage_updated_at=now - timedelta(days=stage_index),
+            created_at=now,
+            updated_at=now,
+            version=stage_index + 1
+        ))
+    return leads
+
+def measure(label: str, func: Callable[[], object], per: int, repeat: int, number: int) -> float:
+    best = min(timeit.repeat(func, repeat=repeat, number=number)) / number
+    print(f"  {label:<44} {best / per * 1e6:8.2f} us/lead")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-lead JSON encoding cost before and after the pydantic-core path")
+    parser.add_argument("--page-size", type=int, default=100, help="Leads per list response")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds; the best is reported")
+    parser.add_argument("--number", type=int, default=200, help="Encodes per round")
+    args = parser.parse_args()
+
+    leads = build_leads(args.page_size)
+    page = LeadPaginatedResponse(
+        items=leads,
+        total=len(leads),
+        page=1,
+        page_size=args.page_size,
+        total_pages=1
+    )
+    adapter = TypeAdapter(LeadPaginatedResponse)
+
+    def rest_before():
+        # What FastAPI does with a returned model: validate, convert to a JSON-able dict, json.dumps
+        value = adapter.validate_python(page)
+        return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+    def rest_after():
+        return ModelJSONResponse(page).body
+
+    def broadcast_before():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return [json.dumps(lead.dict(), cls=LegacyJSONEncoder) for lead in leads]
+
+    def broadcast_after():
+        return [json_dumps(lead.model_dump()) for lead in leads]
+
+    assert json.loads(rest_before()) == json.loads(rest_after())
+
+    print(f"List response ({args.page_size} leads)")
+    before = measure("before: validate + jsonable dict + json.dumps", rest_before, len(leads), args.repeat, args.number)
+    after = measure("after: ModelJSONResponse", rest_after, len(leads), args.repeat, args.number)
+    print(f"  speedup {before / after:.1f}x")
+
+    print("Broadcast payloads")
+    before = measure("before: lead.dict() + CustomJSONEncoder", broadcast_before, len(leads), args.repeat, args.number)
+    after = measure("after: model_dump() + json_dumps", broadcast_after, len(leads), args.repeat, args.number)
+    print(f"  speedup {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(backend_dir)
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from app.core.config import settings
+from app.crud.lead import lead
+from app.db.indexes import ensure_indexes
+from app.main import app
+from app.models.enums import Stage, SortField
+from app.models.lead import LeadCreate
+from app.websocket.connection import manager
+from scripts.seed_data import LeadGenerator
+
+# Search terms the search benchmarks cycle through: selective and broad ones
+SEARCH_TERMS = ["frost", "apex labs", "4242@", "nova", "walsh", "pulse group"]
+
+# Leads the create benchmarks add are told apart from seeded ones by email
+CREATED_EMAIL_PREFIX = "created"
+
+API = settings.API_V1_STR
+
+Operation = Callable[[int], Awaitable[Any]]
+
+
+async def seed(generator: LeadGenerator, size: int, concurrency: int) -> float:
+    """
+    Grow the leads collection to `size` generated leads, with their stage
+    events and pipeline stats. Sizes are seeded in increasing order, each
+    adding to the previous one.
+    """
+    existing = await lead.get_collection().count_documents({})
+    if size <= existing:
+        return 0.0
+    return await generator.insert(size - existing, start=existing, concurrency=concurrency)
+
+
+async def measure(name: str, op: Operation, iterations: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    """
+    Run `op` `iterations` times from `concurrency` concurrent workers and
+    report throughput and latency percentiles in milliseconds. Each call is
+    passed its iteration number, so operations can vary their input.
+    """
+    for i in range(warmup):
+        await op(-1 - i)
+
+    latencies: List[float] = []
+    next_index = iter(range(iterations))
+
+    async def worker():
+        for i in next_index:
+            start = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    result = {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput_per_s": round(iterations / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1e3, 3),
+        "p50_ms": round(cuts[49] * 1e3, 3),
+        "p95_ms": round(cuts[94] * 1e3, 3),
+        "p99_ms": round(cuts[98] * 1e3, 3),
+        "max_ms": round(max(latencies) * 1e3, 3),
+    }
+    print(
+        f"  {name:<40} {result['throughput_per_s']:>9.1f}/s  p50 {result['p50_ms']:>8.2f}  "
+        f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms"
+    )
+    return result
+
+
+def new_lead(generator: LeadGenerator, number: int) -> LeadCreate:
+    """A lead for the create benchmarks, whose email no seeded lead has"""
+    doc, _ = generator.build(number)
+    fields = {name: doc[name] for name in LeadCreate.model_fields if name in doc}
+    return LeadCreate(**{**fields, "email": f"{CREATED_EMAIL_PREFIX}{number}@example.com"})
+
+
+def crud_operations(generator: LeadGenerator, ids: List[str], created: Iterator[int]) -> Dict[str, Operation]:
+    """CRUDLead hot paths, keyed by benchmark name"""
+    stages = Stage.list()
+    operations: Dict[str, Operation] = {}
+
+    for sort_field in SortField:
+        async def get_multi(i: int, sort_by: str = sort_field.value):
+            return await lead.get_multi(limit=10, sort_by=sort_by, sort_desc=True)
+        operations[f"crud.get_multi.{sort_field.value}"] = get_multi
+
+    async def search(i: int):
+        return await lead.get_multi(limit=10, search=SEARCH_TERMS[i % len(SEARCH_TERMS)])
+
+    async def get_count(i: int):
+        # Measure the count query rather than the count cache
+        lead.invalidate_counts()
+        return await lead.get_count()
+
+    async def get_count_search(i: int):
+        lead.invalidate_counts()
+        return await lead.get_count(SEARCH_TERMS[i % len(SEARCH_TERMS)])
+
+    async def create(i: int):
+        return await lead.create(new_lead(generator, next(created)))
+
+    async def update_stage(i: int):
+        # Sampled leads are cycled through the stages, so updates record stage events
+        return await lead.update(ids[i % len(ids)], {"current_stage": stages[i % len(stages)]})
+
+    operations.update({
+        "crud.search": search,
+        "crud.get_count": get_count,
+        "crud.get_count.search": get_count_search,
+        "crud.create": create,
+        "crud.update.stage": update_stage,
+    })
+    return operations
+
+
+def http_operations(
+    client: httpx.AsyncClient, generator: LeadGenerator, ids: List[str], created: Iterator[int]
+) -> Dict[str, Operation]:
+    """The lead endpoints, called through the ASGI app with its middleware, keyed by benchmark name"""
+    stages = Stage.list()
+    operations: Dict[str, Operation] = {}
+
+    def check(response: httpx.Response) -> httpx.Response:
+        response.raise_for_status()
+        return response
+
+    for sort_field in SortField:
+        async def list_leads(i: int, sort_by: str = sort_field.value):
+            return check(await client.get(f"{API}/leads/", params={"sort_by": sort_by}))
+        operations[f"http.list.{sort_field.value}"] = list_leads
+
+    async def search(i: int):
+        return check(await client.get(f"{API}/leads/", params={"search": SEARCH_TERMS[i % len(SEARCH_TERMS)]}))
+
+    async def get_lead(i: int):
+        return check(await client.get(f"{API}/leads/{ids[i % len(ids)]}"))
+
+    async def stats(i: int):
+        return check(await client.get(f"{API}/leads/stats"))
+
+    async def create(i: int):
+        return check(await client.post(
+            f"{API}/leads/",
+            params={"user_id": "benchmark"},
+            content=new_lead(generator, next(created)).model_dump_json(),
+            headers={"content-type": "application/json"}
+        ))
+
+    async def update_stage(i: int):
+        return check(await client.put(
+            f"{API}/leads/{ids[i % len(ids)]}",
+            params={"user_id": "benchmark"},
+            json={"current_stage": stages[(i + 1) % len(stages)]}
+        ))
+
+    operations.update({
+        "http.search": search,
+        "http.get": get_lead,
+        "http.stats": stats,
+        "http.create": create,
+        "http.update.stage": update_stage,
+    })
+    return operations
+
+
+async def sample_ids(count: int) -> List[str]:
+    """IDs of existing leads, spread over the collection, for reads and updates"""
+    docs = await lead.get_collection().aggregate([
+        {"$sample": {"size": count}},
+        {"$project": {"_id": 1}}
+    ]).to_list(length=count)
+    return [str(doc["_id"]) for doc in docs]
+
+
+async def run_size(
+    size: int, args: argparse.Namespace, client: httpx.AsyncClient, generator: LeadGenerator
+) -> Dict[str, Any]:
+    print(f"\n{size} leads")
+    seed_seconds = await seed(generator, size, args.seed_concurrency)
+    ids = await sample_ids(1000)
+
+    benchmarks: Dict[str, Any] = {}
+    created = itertools.count()
+    operations = {
+        **crud_operations(generator, ids, created),
+        **http_operations(client, generator, ids, created)
+    }
+    for name, op in operations.items():
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        benchmarks[name] = await measure(name, op, args.iterations, args.concurrency, args.warmup)
+
+    await remove_created_leads()
+    return {"seed_seconds": round(seed_seconds, 1), "benchmarks": benchmarks}
+
+
+async def remove_created_leads() -> None:
+    """Put the collection back to the seeded leads before seeding the next size"""
+    created_filter = {"email": {"$regex": f"^{CREATED_EMAIL_PREFIX}"}}
+    async for doc in lead.get_collection().find(created_filter, {"_id": 1}):
+        await lead.delete(str(doc["_id"]))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=backend_dir
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path: str, results: Dict[str, Any]) -> None:
+    """Print the latency percentile changes of every benchmark against an earlier result file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange against {baseline_path} ({baseline['meta'].get('commit') or 'unknown commit'})")
+    for size, run in results["sizes"].items():
+        before = baseline["sizes"].get(size, {}).get("benchmarks", {})
+        for name, result in run["benchmarks"].items():
+            if name not in before:
+                continue
+            changes = "  ".join(
+                f"{key[:-3]} {(result[key] / before[name][key] - 1) * 100:+6.1f}%"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+                if before[name][key]
+            )
+            print(f"  {size:>8} {name:<40} {changes}")
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.database == settings.MONGODB_DATABASE:
+        raise SystemExit(f"Refusing to benchmark against {args.database}: the database is dropped first")
+
+    mongo = AsyncIOMotorClient(args.uri, maxPoolSize=settings.MONGODB_MAX_POOL_SIZE)
+    try:
+        await mongo.drop_database(args.database)
+        database: AsyncIOMotorDatabase = mongo[args.database]
+        await ensure_indexes(database)
+        lead.db = database
+        # Start the counters at zero so seeding keeps them exact
+        await lead.reconcile_stats()
+        build_info = await database.command("buildInfo")
+        generator = LeadGenerator(seed=args.seed, as_of=args.as_of)
+
+        results: Dict[str, Any] = {
+            "meta": {
+                "commit": git_commit(),
+                "started_at": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "mongodb": build_info.get("version"),
+                "iterations": args.iterations,
+                "concurrency": args.concurrency,
+                "seed": args.seed,
+                "as_of": generator.as_of.isoformat(),
+            },
+            "sizes": {}
+        }
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for size in sorted(args.sizes):
+                results["sizes"][str(size)] = await run_size(size, args, client, generator)
+        return results
+    finally:
+        # Send the coalesced broadcasts of the last updates before the loop closes
+        await manager.shutdown()
+        if not args.keep:
+            await mongo.drop_database(args.database)
+        mongo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark lead CRUD and API hot paths against a throwaway MongoDB and write JSON results"
+    )
+    parser.add_argument("--uri", default=settings.MONGODB_URI, help="MongoDB to benchmark against")
+    parser.add_argument("--database", default="leads_benchmark", help="Database to create, fill and drop")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Lead counts to seed and measure")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated leads")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, help="Date the generated leads are relative to (YYYY-MM-DD); defaults to today")
+    parser.add_argument("--seed-concurrency", type=int, default=4, help="Batches inserted concurrently while seeding")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed calls before each benchmark")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent callers per benchmark")
+    parser.add_argument("--only", nargs="+", help="Run only benchmarks whose name starts with one of these")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON file to write results to")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark database afterwards")
+    args = parser.parse_args()
+
+    results = asyncio.run(benchmark(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        compare(args.baseline, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(backend_dir)
+
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.crud.lead import lead
+
+# Leads still carrying the embedded history array
+LEGACY_FILTER = {"stage_history": {"$exists": True}}
+
+def parse_changed_at(value: Any) -> Optional[datetime]:
+    """Embedded entries stored changed_at as an ISO string, a datetime or null"""
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def build_events(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Stage events for the embedded history of one lead, marked as migrated"""
+    events = []
+    for entry in doc.get("stage_history") or []:
+        if not isinstance(entry, dict) or not entry.get("to_stage"):
+            continue
+        event = lead.build_stage_event(
+            doc["_id"],
+            entry.get("from_stage"),
+            entry["to_stage"],
+            parse_changed_at(entry.get("changed_at")),
+            entry.get("notes")
+        )
+        event["migrated"] = True
+        events.append(event)
+    return events
+
+async def migrate(batch_size: int) -> None:
+    """
+    Move embedded stage_history arrays into lead_stage_events, one batch of
+    leads at a time. Each batch first drops events an interrupted run left
+    for its leads, then inserts their events and finally unsets the arrays,
+    so the migration can be stopped and re-run at any point.
+    """
+    leads = lead.get_collection()
+    events = lead.get_events_collection()
+
+    remaining = await leads.count_documents(LEGACY_FILTER)
+    print(f"{remaining} leads to migrate")
+
+    migrated = 0
+    moved = 0
+    start_time = datetime.now()
+    while True:
+        docs = await leads.find(LEGACY_FILTER, {"stage_history": 1}).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            break
+
+        ids = [doc["_id"] for doc in docs]
+        batch_events = [event for doc in docs for event in build_events(doc)]
+
+        await events.delete_many({"lead_id": {"$in": ids}, "migrated": True})
+        if batch_events:
+            await events.insert_many(batch_events, ordered=False)
+        await leads.update_many({"_id": {"$in": ids}}, {"$unset": {"stage_history": ""}})
+
+        migrated += len(docs)
+        moved += len(batch_events)
+        print(f"  {migrated}/{remaining} leads, {moved} events")
+
+    elapsed_time = datetime.now() - start_time
+    print(f"Migrated {migrated} leads and {moved} events in {elapsed_time.total_seconds():.2f} seconds")
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded lead stage history into the lead_stage_events collection")
+    parser.add_argument("--batch-size", type=int, default=500, help="Leads migrated per batch")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(backend_dir)
+
+import asyncio
+from datetime import datetime
+from app.crud.lead import lead
+
+async def main():
+    """
+    Rebuild the pipeline stats from the leads and report drift.
+    Safe to run at any time, for example from cron.
+    """
+    start_time = datetime.now()
+    result = await lead.reconcile_stats()
+
+    print(f"Rebuilt pipeline stats for {result.stats.total} leads")
+    for stage, count in result.stats.stages.items():
+        print(f"  {stage:<20} {count}")
+    print(f"  {'Engaged':<20} {result.stats.engaged}")
+    print(f"  {'Not Engaged':<20} {result.stats.not_engaged}")
+
+    if result.drift:
+        print("Drift (stored - actual):")
+        for key, value in result.drift.items():
+            print(f"  {key:<27} {value:+d}")
+    else:
+        print("No drift")
+
+    elapsed_time = datetime.now() - start_time
+    print(f"Time taken: {elapsed_time.total_seconds():.2f} seconds")
+
+if __name__ == "__main__":
+    asyncio.run(main())
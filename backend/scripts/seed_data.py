@@ -5,27 +5,24 @@ from pathlib import Path
 backend_dir = str(Path(__file__).resolve().parent.parent)
 sys.path.append(backend_dir)
 
+import argparse
+import asyncio
+import random
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from app.models.lead import LeadCreate
-from app.models.enums import Stage
-from app.crud.lead import lead
+from app.models.enums import Stage, EngagementStatus
+from app.crud.lead import lead, DUPLICATE_KEY_ERROR
+from app.db.indexes import ensure_indexes
 
 class LeadSeeder:
     """
     Lead seeder class to handle the seeding of lead data
     """
     
-    # Define stages in order of progression
-    STAGES: List[str] = [
-        Stage.NEW_LEAD.value,
-        Stage.INITIAL_CONTACT.value,
-        Stage.MEETING_SCHEDULED.value,
-        Stage.PROPOSAL_SENT.value,
-        Stage.NEGOTIATION.value,
-        Stage.CLOSED_WON.value,
-    ]
-
     # Sample lead data
     SAMPLE_LEADS: List[Dict[str, Any]] = [
         {
@@ -112,61 +109,11 @@ class LeadSeeder:
     ]
 
     @classmethod
-    def _generate_stage_history(cls, current_stage: str) -> List[Dict[str, Any]]:
+    def _build_lead(cls, lead_data: Dict[str, Any]) -> LeadCreate:
         """
-        Generate stage history for a lead up to their current stage
+        Build a single lead; its stage history is recorded when it is created
         """
-        current_index = cls.STAGES.index(current_stage)
-        stage_history = []
-        base_time = None  # Don't set base time for historical stages
-
-        # For stages before the current stage, set changed_at to None
-        for i in range(current_index + 1):
-            stage_change = {
-                "from_stage": cls.STAGES[i-1] if i > 0 else None,
-                "to_stage": cls.STAGES[i],
-                "changed_at": datetime.now() if i == current_index else None,  # Only set time for current stage
-                "notes": (
-                    f"Current stage: {cls.STAGES[i]}" if i == current_index
-                    else f"Previous stage: {cls.STAGES[i]}"
-                )
-            }
-            stage_history.append(stage_change)
-
-        return stage_history
-
-    @classmethod
-    async def _create_lead(cls, lead_data: Dict[str, Any]) -> None:
-        """
-        Create a single lead with stage history
-        """
-        try:
-            # Check if lead already exists
-            existing_lead = await lead.get_by_email(email=lead_data["email"])
-            if existing_lead:
-                print(f"Lead with email {lead_data['email']} already exists, skipping...")
-                return
-
-            # Generate stage history
-            stage_history = cls._generate_stage_history(lead_data["current_stage"])
-            
-            # Add stage history and updated timestamp
-            lead_data.update({
-                "stage_history": stage_history,
-                "stage_updated_at": next(
-                    (change["changed_at"] for change in reversed(stage_history) if change["changed_at"]),
-                    datetime.now()
-                )
-            })
-
-            # Create the lead
-            lead_in = LeadCreate(**lead_data)
-            created_lead = await lead.create(lead_in)
-            print(f"Created lead: {created_lead.name} ({created_lead.email})")
-
-        except Exception as e:
-            print(f"Error creating lead {lead_data.get('email')}: {str(e)}")
-            raise
+        return LeadCreate(**{**lead_data, "stage_updated_at": datetime.now()})
 
     @classmethod
     async def seed(cls) -> None:
@@ -177,12 +124,16 @@ class LeadSeeder:
         start_time = datetime.now()
 
         try:
-            for lead_data in cls.SAMPLE_LEADS:
-                await cls._create_lead(lead_data)
+            # Insert every lead in one batch; existing emails are reported, not fatal
+            leads_in = [cls._build_lead(lead_data) for lead_data in cls.SAMPLE_LEADS]
+            result = await lead.create_many(leads_in)
+
+            for email in result.duplicate_emails:
+                print(f"Lead with email {email} already exists, skipping...")
 
             elapsed_time = datetime.now() - start_time
             print(f"\nSeeding completed successfully!")
-            print(f"Created {len(cls.SAMPLE_LEADS)} leads")
+            print(f"Created {len(result.inserted_ids)} leads")
             print(f"Time taken: {elapsed_time.total_seconds():.2f} seconds")
 
         except Exception as e:
@@ -190,16 +141,229 @@ class LeadSeeder:
             print(f"Error: {str(e)}")
             raise
 
-async def main():
+class LeadGenerator:
+    """
+    Synthetic leads for load testing, streamed from a seeded RNG.
+
+    Each lead is derived from the seed and its index alone, so a seed always
+    produces the same dataset, as of the same date, and a run can be resumed
+    or extended from any index. Leads are spread over the funnel, engage more
+    the further they got, and carry a stage history from their creation to
+    their current stage.
+    """
+
+    # Share of leads in each stage; most drop out early in the funnel
+    STAGE_WEIGHTS: Dict[str, int] = {
+        Stage.NEW_LEAD.value: 30,
+        Stage.INITIAL_CONTACT.value: 25,
+        Stage.MEETING_SCHEDULED.value: 18,
+        Stage.PROPOSAL_SENT.value: 12,
+        Stage.NEGOTIATION.value: 8,
+        Stage.CLOSED_WON.value: 7,
+    }
+
+    # Chance a lead in each stage is engaged
+    ENGAGEMENT_RATES: Dict[str, float] = {
+        Stage.NEW_LEAD.value: 0.05,
+        Stage.INITIAL_CONTACT.value: 0.25,
+        Stage.MEETING_SCHEDULED.value: 0.5,
+        Stage.PROPOSAL_SENT.value: 0.65,
+        Stage.NEGOTIATION.value: 0.75,
+        Stage.CLOSED_WON.value: 0.4,
+    }
+
+    # Mean days a lead spends in a stage before moving on
+    MEAN_DAYS_IN_STAGE = 6.0
+
+    FIRST_NAMES: List[str] = [
+        "Aria", "Noah", "Zara", "Felix", "Milo", "Ruby", "Leo", "Iris", "Finn", "Nina",
+        "Owen", "Maya", "Ezra", "Luna", "Jude", "Cleo", "Theo", "Ivy", "Axel", "Mira",
+    ]
+    LAST_NAMES: List[str] = [
+        "Frost", "Chen", "West", "Gray", "Park", "Shaw", "Walsh", "Cole", "Hayes", "Reid",
+        "Stone", "Lane", "Patel", "Kim", "Novak", "Silva", "Moreau", "Berg", "Okafor", "Tanaka",
+    ]
+    COMPANY_WORDS: List[str] = [
+        "Prism", "Apex", "Cube", "Nova", "Echo", "Wave", "Peak", "Drift", "Core", "Orbit",
+        "Pulse", "Vertex", "Summit", "Harbor", "Quill", "Atlas", "Ember", "Lumen", "Cobalt", "Vanta",
+    ]
+    COMPANY_SUFFIXES: List[str] = ["Tech", "Systems", "Analytics", "Labs", "Group", "Innovations", "Pvt. Ltd."]
+
+    def __init__(self, seed: int = 0, as_of: Optional[datetime] = None, days: int = 365):
+        self.seed = seed
+        self.as_of = as_of or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.days = days
+        self._stages = list(self.STAGE_WEIGHTS)
+        self._weights = list(self.STAGE_WEIGHTS.values())
+
+    def build(self, index: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """The lead document with a given index and its stage events"""
+        rng = random.Random(f"{self.seed}-{index}")
+
+        first = rng.choice(self.FIRST_NAMES)
+        last = rng.choice(self.LAST_NAMES)
+        word = rng.choice(self.COMPANY_WORDS)
+        current_stage = rng.choices(self._stages, self._weights)[0]
+        engaged = rng.random() < self.ENGAGEMENT_RATES[current_stage]
+
+        # Recent leads outnumber old ones
+        created_at = lead.db_time(self.as_of - timedelta(days=rng.triangular(0, self.days, 0)))
+
+        # Time spent in each stage before the current one, squeezed into the lead's age
+        rank = Stage.rank(current_stage)
+        gaps = [rng.expovariate(1 / self.MEAN_DAYS_IN_STAGE) for _ in range(rank)]
+        available = (self.as_of - created_at).total_seconds() / 86400
+        if sum(gaps) > available:
+            scale = available / sum(gaps) * rng.uniform(0.5, 1.0)
+            gaps = [gap * scale for gap in gaps]
+        changed_at = [created_at]
+        for gap in gaps:
+            changed_at.append(lead.db_time(changed_at[-1] + timedelta(days=gap)))
+        stage_updated_at = changed_at[-1]
+
+        # Leads nobody has reached out to yet have no contact date
+        last_contacted = None
+        if current_stage != Stage.NEW_LEAD.value or rng.random() < 0.4:
+            since_stage = (self.as_of - stage_updated_at).total_seconds()
+            last_contacted = lead.db_time(stage_updated_at + timedelta(seconds=since_stage * rng.random() ** 2))
+
+        doc = lead.prepare_new_lead(LeadCreate.model_construct(
+            name=f"{first} {last}",
+            email=f"{first}.{last}.{index}@{word}.com".lower(),
+            company=f"{word} {rng.choice(self.COMPANY_SUFFIXES)}",
+            status=(EngagementStatus.ENGAGED if engaged else EngagementStatus.NOT_ENGAGED).value,
+            engaged=engaged,
+            current_stage=current_stage,
+            stage_updated_at=stage_updated_at,
+            last_contacted=last_contacted
+        ), created_at)
+        # Creation time leads the _id, as it does for ids the driver assigns
+        doc["_id"] = ObjectId(ObjectId.from_datetime(created_at).binary[:4] + rng.randbytes(8))
+        doc["updated_at"] = max(stage_updated_at, last_contacted or stage_updated_at)
+        doc["version"] = rank + 1
+
+        events = [
+            lead.build_stage_event(
+                doc["_id"],
+                self._stages[i - 1] if i > 0 else None,
+                self._stages[i],
+                changed_at[i]
+            )
+            for i in range(rank + 1)
+        ]
+        return doc, events
+
+    async def _insert_batch(self, batch: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> Tuple[int, int]:
+        """
+        Insert one batch of leads with a single unordered insert_many, then
+        the events of those inserted. Leads already present, such as from an
+        earlier run with the same seed, are skipped.
+        """
+        docs = [doc for doc, _ in batch]
+        failed = set()
+        try:
+            await lead.get_collection().insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            failed = {error["index"] for error in errors}
+
+        inserted = [entry for index, entry in enumerate(batch) if index not in failed]
+        events = [event for _, lead_events in inserted for event in lead_events]
+        if events:
+            await lead.get_events_collection().insert_many(events, ordered=False)
+        await lead.inc_stats(lead.stats_delta(added=[doc for doc, _ in inserted]))
+        return len(inserted), len(events)
+
+    async def insert(self, count: int, *, start: int = 0, batch_size: int = 1000, concurrency: int = 4) -> float:
+        """
+        Generate leads start to start + count and insert them with up to
+        `concurrency` batches of batch_size leads in flight at once. Batches
+        are generated only as slots free up, so memory stays flat however
+        many leads are generated. Returns the elapsed seconds.
+        """
+        slots = asyncio.Semaphore(concurrency)
+        tasks: Set[asyncio.Task] = set()
+        totals = {"leads": 0, "events": 0, "skipped": 0}
+        start_time = time.perf_counter()
+        last_report = start_time
+
+        def report(final: bool = False) -> None:
+            elapsed = time.perf_counter() - start_time
+            rows = totals["leads"] + totals["events"]
+            print(
+                f"{'Inserted' if final else '  inserted'} {totals['leads']}/{count} leads and "
+                f"{totals['events']} stage events in {elapsed:.1f} s: "
+                f"{totals['leads'] / elapsed:,.0f} leads/s, {rows / elapsed:,.0f} rows/s"
+                + (f", {totals['skipped']} already present" if totals["skipped"] else "")
+            )
+
+        async def insert_batch(batch):
+            nonlocal last_report
+            try:
+                leads_inserted, events_inserted = await self._insert_batch(batch)
+            finally:
+                slots.release()
+            totals["leads"] += leads_inserted
+            totals["events"] += events_inserted
+            totals["skipped"] += len(batch) - leads_inserted
+            if time.perf_counter() - last_report >= 5:
+                last_report = time.perf_counter()
+                report()
+
+        try:
+            for batch_start in range(start, start + count, batch_size):
+                await slots.acquire()
+                # Stop at the first batch that failed
+                for task in [task for task in tasks if task.done()]:
+                    tasks.discard(task)
+                    task.result()
+                batch_end = min(batch_start + batch_size, start + count)
+                batch = [self.build(index) for index in range(batch_start, batch_end)]
+                tasks.add(asyncio.create_task(insert_batch(batch)))
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        report(final=True)
+        return time.perf_counter() - start_time
+
+async def main(args: argparse.Namespace):
     """
     Main function to run the seeding process
     """
     try:
-        await LeadSeeder.seed()
+        # Duplicates, including leads from an earlier run, are rejected by the unique email index
+        await ensure_indexes(lead.db)
+        if args.generate:
+            generator = LeadGenerator(seed=args.seed, as_of=args.as_of, days=args.days)
+            print(f"Generating {args.generate} leads from seed {args.seed} as of {generator.as_of.date()}...")
+            await generator.insert(
+                args.generate,
+                start=args.start,
+                batch_size=args.batch_size,
+                concurrency=args.concurrency
+            )
+        else:
+            await LeadSeeder.seed()
     except Exception as e:
         print(f"Fatal error during seeding: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the sample leads, or generate a large synthetic dataset")
+    parser.add_argument("--generate", type=int, metavar="COUNT", help="Generate this many synthetic leads instead of the samples")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed; the same seed generates the same leads")
+    parser.add_argument("--start", type=int, default=0, help="Index of the first generated lead, to extend a dataset")
+    parser.add_argument(
+        "--as-of",
+        type=datetime.fromisoformat,
+        help="Date the generated leads are relative to (YYYY-MM-DD); defaults to today, so pass it to regenerate the same leads later"
+    )
+    parser.add_argument("--days", type=int, default=365, help="How far back lead creation dates go")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Leads per insert_many")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches inserted concurrently")
+    asyncio.run(main(parser.parse_args()))
@@ -5,6 +5,7 @@ from app.core.config import settings
 from app.models.lead import Lead, LeadCreate
 from datetime import datetime, UTC
 from app.core.logging import logger
+from app.db.indexes import ensure_indexes
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -25,6 +26,11 @@ async def test_db():
         
         # Clear database before each test
         await db.leads.delete_many({})
+        await db.lead_stage_events.delete_many({})
+        await db.pipeline_stats.delete_many({})
+        
+        # Match the production schema, including the unique email index
+        await ensure_indexes(db)
         
         # Test connection
         await client.admin.command('ping')
@@ -34,6 +40,8 @@ async def test_db():
         
         # Cleanup after test
         await db.leads.delete_many({})
+        await db.lead_stage_events.delete_many({})
+        await db.pipeline_stats.delete_many({})
         client.close()
         logger.info("Cleaned up test database")
         
@@ -48,6 +56,7 @@ async def crud(test_db):
     
     class TestCRUDLead(CRUDLead):
         def __init__(self, test_db):
+            super().__init__()
             self.db = test_db
             self.collection_name = "leads"
 
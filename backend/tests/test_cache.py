@@ -0,0 +1,37 @@
+import time
+from app.core.cache import TTLCache
+
+def test_cache_hits_and_misses():
+    """Test lookups are counted as hits or misses"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 1}
+
+def test_cache_evicts_least_recently_used():
+    """Test the oldest unused entry is evicted when full"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_cache_expires_entries():
+    """Test entries expire after the TTL"""
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_cache_disabled():
+    """Test a zero-sized cache stores nothing"""
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") is None
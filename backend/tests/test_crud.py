@@ -1,10 +1,11 @@
 import pytest
 from datetime import datetime, timedelta, UTC
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from app.crud.lead import CRUDLead
 from app.models.lead import LeadCreate, LeadUpdate
-from app.core.exceptions import LeadNotFoundException, DuplicateLeadException
-from app.models.enums import Stage
+from app.core.exceptions import LeadNotFoundException, DuplicateLeadException, InvalidCursorException
+from app.models.enums import Stage, SortField
 
 @pytest.mark.asyncio
 class TestCRUDLead:
@@ -24,6 +25,7 @@ class TestCRUDLead:
         """Create a test CRUD instance"""
         class TestCRUDLead(CRUDLead):
             def __init__(self, test_db):
+                super().__init__()
                 self.db = test_db
                 self.collection_name = "leads"
 
@@ -45,10 +47,10 @@ class TestCRUDLead:
         assert not lead.engaged
         
         # Verify stage history was created
-        assert lead.stage_history
-        assert len(lead.stage_history) == 1
-        assert lead.stage_history[0]["to_stage"] == Stage.NEW_LEAD.value
-        assert lead.stage_history[0]["from_stage"] is None
+        history, total = await crud.get_stage_history(lead.id)
+        assert total == 1
+        assert history[0].to_stage == Stage.NEW_LEAD.value
+        assert history[0].from_stage is None
         
         # Test duplicate email
         with pytest.raises(DuplicateLeadException):
@@ -128,9 +130,10 @@ class TestCRUDLead:
         }
         updated = await crud.update(created.id, stage_update)
         assert updated.current_stage == Stage.INITIAL_CONTACT.value
-        assert len(updated.stage_history) == 2
-        assert updated.stage_history[-1]["from_stage"] == Stage.NEW_LEAD.value
-        assert updated.stage_history[-1]["to_stage"] == Stage.INITIAL_CONTACT.value
+        history, total = await crud.get_stage_history(created.id)
+        assert total == 2
+        assert history[-1].from_stage == Stage.NEW_LEAD.value
+        assert history[-1].to_stage == Stage.INITIAL_CONTACT.value
         
         # Test engagement status update
         engagement_update = {
@@ -193,9 +196,8 @@ class TestCRUDLead:
         
         # Verify timestamps are properly spaced
         for i, entry in enumerate(history):
-            entry_time = datetime.fromisoformat(entry["changed_at"].replace('Z', '+00:00'))
             expected_time = base_time - timedelta(days=len(history) - 1 - i)
-            assert abs((entry_time - expected_time).total_seconds()) < 1
+            assert abs((entry["changed_at"] - expected_time).total_seconds()) < 1
 
     async def test_stage_transition_handling(self, crud, test_db, sample_lead_create):
         """Test stage transition handling"""
@@ -204,14 +206,411 @@ class TestCRUDLead:
         
         # Test stage transition
         new_stage = Stage.INITIAL_CONTACT.value
-        history = crud._handle_stage_transition(lead, new_stage)
-        
-        assert len(history) == 2
-        assert history[-1]["from_stage"] == Stage.NEW_LEAD.value
-        assert history[-1]["to_stage"] == new_stage
+        updated, event = await crud.update_with_event(lead.id, {"current_stage": new_stage})
+        assert event.from_stage == Stage.NEW_LEAD.value
+        assert event.to_stage == new_stage
+        assert updated.stage_updated_at == event.changed_at
+        assert updated == await crud.get(lead.id)
+
+        history, total = await crud.get_stage_history(lead.id)
+        assert total == 2
+        assert history[-1] == event
         
         # Test no transition (same stage)
-        lead.current_stage = new_stage  # Update lead's current stage
-        lead.stage_history = history    # Update lead's history
-        history = crud._handle_stage_transition(lead, new_stage)
-        assert len(history) == 2  # No new entry added for same stage 
\ No newline at end of file
+        updated, event = await crud.update_with_event(lead.id, {"current_stage": new_stage, "name": "Same Stage"})
+        assert updated.name == "Same Stage"
+        assert event is None
+        _, total = await crud.get_stage_history(lead.id)
+        assert total == 2  # No new entry added for same stage
+
+    async def test_stage_history_paging(self, crud, test_db, sample_lead_create):
+        """Test stage history pages are ordered and removed with the lead"""
+        lead = await crud.create(LeadCreate(**{
+            **sample_lead_create.model_dump(),
+            "current_stage": Stage.MEETING_SCHEDULED.value
+        }))
+
+        first, total = await crud.get_stage_history(lead.id, limit=2)
+        second, _ = await crud.get_stage_history(lead.id, skip=2, limit=2)
+        assert total == 3
+        assert [event.to_stage for event in first + second] == Stage.list()[:3]
+
+        await crud.delete(lead.id)
+        assert await crud.get_stage_history(lead.id) == ([], 0)
+
+    async def test_get_multi_after(self, crud, test_db, sample_lead_create):
+        """Test keyset pagination matches offset pagination for every sort field"""
+        for i in range(7):
+            await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "name": f"Test {i % 3}",
+                "company": f"Company {i % 2}",
+                "last_contacted": None if i % 3 == 0 else datetime.now(UTC) - timedelta(days=i % 2)
+            }))
+
+        for sort_field in SortField:
+            for sort_desc in (True, False):
+                expected = await crud.get_multi(limit=100, sort_by=sort_field.value, sort_desc=sort_desc)
+
+                paged, cursor = [], None
+                while True:
+                    items, cursor = await crud.get_multi_after(
+                        cursor=cursor, limit=3, sort_by=sort_field.value, sort_desc=sort_desc
+                    )
+                    paged.extend(items)
+                    if cursor is None:
+                        break
+
+                assert [l.id for l in paged] == [l.id for l in expected]
+
+        # A cursor cannot be replayed against a different sort
+        _, cursor = await crud.get_multi_after(limit=3, sort_by="name", sort_desc=False)
+        with pytest.raises(InvalidCursorException):
+            await crud.get_multi_after(cursor=cursor, limit=3, sort_by="company", sort_desc=False)
+
+    async def test_sort_by_stage_follows_pipeline(self, crud, test_db, sample_lead_create):
+        """Test sorting by current_stage uses pipeline order, not alphabetical order"""
+        stages = [Stage.CLOSED_WON, Stage.NEW_LEAD, Stage.MEETING_SCHEDULED, Stage.INITIAL_CONTACT]
+        for i, stage in enumerate(stages):
+            created = await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "current_stage": Stage.NEW_LEAD.value
+            }))
+            await crud.update(created.id, {"current_stage": stage.value})
+
+        leads = await crud.get_multi(limit=10, sort_by="current_stage", sort_desc=False)
+        expected = [stage.value for stage in Stage if stage in stages]
+        assert [l.current_stage for l in leads] == expected
+
+        page = await crud.get_page(limit=2, sort_by="current_stage", sort_desc=True, fields=["name"])
+        page = await crud.get_page(cursor=page.next_cursor, limit=2, sort_by="current_stage", sort_desc=True, fields=["name"])
+        assert [l["current_stage"] for l in page.items] == expected[1::-1]
+
+    async def test_get_page(self, crud, test_db, sample_lead_create):
+        """Test the combined page + count query matches separate queries"""
+        for i in range(5):
+            await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "name": f"Test {i}",
+                "company": f"Company {i}"
+            }))
+
+        page = await crud.get_page(skip=2, limit=2, sort_by="name", sort_desc=False)
+        expected = await crud.get_multi(skip=2, limit=2, sort_by="name", sort_desc=False)
+        assert [l.id for l in page.items] == [l.id for l in expected]
+        assert page.total == 5
+        assert page.total_estimated
+        assert page.next_cursor is not None
+
+        # Following the cursor continues right after the page
+        page = await crud.get_page(cursor=page.next_cursor, limit=2, sort_by="name", sort_desc=False)
+        assert [l.name for l in page.items] == ["Test 4"]
+        assert page.total == 5
+        assert page.next_cursor is None
+
+        # Search filter applies to both the items and the count, which is exact
+        for _ in range(2):
+            page = await crud.get_page(search="Test 1")
+            assert [l.name for l in page.items] == ["Test 1"]
+            assert page.total == 1
+            assert not page.total_estimated
+            assert page.next_cursor is None
+
+        page = await crud.get_page(search="nobody")
+        assert page.items == []
+        assert page.total == 0
+
+    async def test_get_page_fields(self, crud, test_db, sample_lead_create):
+        """Test pages read with a projection hold only the selected fields"""
+        for i in range(3):
+            await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "name": f"Test {i}"
+            }))
+
+        page = await crud.get_page(limit=2, sort_by="name", sort_desc=False, fields=["name", "current_stage"])
+        assert [set(item) for item in page.items] == [{"id", "name", "current_stage"}] * 2
+        assert [item["name"] for item in page.items] == ["Test 0", "Test 1"]
+
+        # The sort field is read even when not selected, so cursors still work
+        page = await crud.get_page(cursor=page.next_cursor, limit=2, sort_by="name", sort_desc=False, fields=["company"])
+        assert page.items == [{"id": page.items[0]["id"], "company": "Test Company", "name": "Test 2"}]
+
+        # Filtered offset pages go through the $facet pipeline
+        page = await crud.get_page(search="Test 1", fields=["email"])
+        assert [set(item) for item in page.items] == [{"id", "email", "created_at"}]
+
+    async def test_count_cache_invalidation(self, crud, test_db, sample_lead_create):
+        """Test cached counts are dropped on create, update and delete"""
+        assert await crud.get_count(search="Company") == 0
+        assert await crud.get_count(search="Company") == 0
+        assert crud._count_cache.hits == 1
+
+        created = await crud.create(sample_lead_create)
+        assert await crud.get_count(search="Company") == 1
+
+        await crud.update(created.id, {"company": "Renamed Co"})
+        assert await crud.get_count(search="Company") == 0
+
+        await crud.delete(created.id)
+        assert await crud.get_count() == 0
+
+    async def test_stream(self, crud, test_db, sample_lead_create):
+        """Test streaming export applies projection, sort and search"""
+        for i in range(3):
+            await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "name": f"Test {i}",
+                "company": f"Company {i}"
+            }))
+
+        docs = [doc async for doc in crud.stream(fields=["name", "company"], sort_by="name", sort_desc=False)]
+        assert docs == [{"name": f"Test {i}", "company": f"Company {i}"} for i in range(3)]
+
+        docs = [doc async for doc in crud.stream(fields=["id", "email"], search="Test 2")]
+        assert len(docs) == 1
+        assert set(docs[0]) == {"id", "email"}
+        assert docs[0]["email"] == "test2@example.com"
+
+    async def test_create_many(self, crud, test_db, sample_lead_create):
+        """Test bulk creation reports duplicates from the unique email index"""
+        existing = await crud.create(sample_lead_create)
+
+        batch = [
+            LeadCreate(**{**sample_lead_create.model_dump(), "email": f"bulk{i}@example.com"})
+            for i in range(3)
+        ]
+        # One duplicate of an existing lead and one within the batch itself
+        batch.insert(1, sample_lead_create)
+        batch.append(LeadCreate(**{**sample_lead_create.model_dump(), "email": "bulk0@example.com"}))
+
+        result = await crud.create_many(batch)
+        assert len(result.inserted_ids) == 3
+        assert result.duplicate_emails == [existing.email, "bulk0@example.com"]
+        assert await crud.get_count() == 4
+
+        created = await crud.get(result.inserted_ids[0])
+        assert created.email == "bulk0@example.com"
+        history, total = await crud.get_stage_history(created.id)
+        assert total == 1
+        assert history[0].to_stage == Stage.NEW_LEAD.value
+
+    async def test_create_writes_nothing_on_failure(self, crud, test_db, sample_lead_create, monkeypatch):
+        """Test a bad stage is rejected before inserting, and leads whose events fail are removed"""
+        unknown_stage = LeadCreate.model_construct(**{**sample_lead_create.model_dump(), "current_stage": "Unknown"})
+        with pytest.raises(ValueError):
+            await crud.create(unknown_stage)
+        with pytest.raises(ValueError):
+            await crud.create_many([sample_lead_create, unknown_stage])
+        assert await test_db.leads.count_documents({}) == 0
+
+        async def fail(events):
+            raise RuntimeError("events unavailable")
+        monkeypatch.setattr(crud, "_record_stage_events", fail)
+        with pytest.raises(RuntimeError):
+            await crud.create(sample_lead_create)
+        with pytest.raises(RuntimeError):
+            await crud.create_many([sample_lead_create])
+        assert await test_db.leads.count_documents({}) == 0
+        assert await crud.get_count() == 0
+
+    async def test_create_many_removes_partial_batch(self, crud, test_db, sample_lead_create, monkeypatch):
+        """Test rows an unordered insert wrote before a non-duplicate error are removed"""
+        leads = test_db.leads
+
+        class PartialInsert:
+            """The leads collection, failing a batch after writing its first lead"""
+            def __getattr__(self, name):
+                return getattr(leads, name)
+
+            async def insert_many(self, docs, ordered=True):
+                await leads.insert_one(docs[0])
+                raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "validation failed"}]})
+
+        monkeypatch.setattr(crud, "get_collection", PartialInsert)
+        batch = [
+            LeadCreate(**{**sample_lead_create.model_dump(), "email": f"bulk{i}@example.com"})
+            for i in range(2)
+        ]
+        with pytest.raises(BulkWriteError):
+            await crud.create_many(batch)
+        assert await leads.count_documents({}) == 0
+
+    async def test_update_to_existing_email(self, crud, test_db, sample_lead_create):
+        """Test changing a lead's email to another lead's is reported as a duplicate"""
+        first = await crud.create(sample_lead_create)
+        second = await crud.create(LeadCreate(**{**sample_lead_create.model_dump(), "email": "other@example.com"}))
+
+        with pytest.raises(DuplicateLeadException):
+            await crud.update(second.id, {"email": first.email})
+        assert (await crud.get(second.id)).email == "other@example.com"
+
+    async def test_update_many(self, crud, test_db, sample_lead_create):
+        """Test bulk updates and stage moves record history only for leads that moved"""
+        leads = []
+        for i in range(3):
+            leads.append(await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "current_stage": Stage.PROPOSAL_SENT.value if i < 2 else Stage.NEGOTIATION.value
+            })))
+
+        result = await crud.update_many(
+            [l.id for l in leads],
+            {"current_stage": Stage.NEGOTIATION.value, "engaged": True, "company": "$not_a_path"}
+        )
+        assert result.matched == 3
+
+        for i, created in enumerate(leads):
+            updated = await crud.get(created.id)
+            assert updated.current_stage == Stage.NEGOTIATION.value
+            assert updated.engaged
+            assert updated.status == "Engaged"
+            assert updated.company == "$not_a_path"
+            # New Lead through Proposal Sent were recorded on creation
+            history, total = await crud.get_stage_history(created.id)
+            assert total == 5
+            assert history[-1].from_stage == Stage.PROPOSAL_SENT.value
+            assert history[-1].to_stage == Stage.NEGOTIATION.value
+            if i == 2:
+                # Already in the target stage: no new history entry
+                assert history[-1].changed_at == created.created_at
+
+    async def test_update_many_skips_leads_changed_meanwhile(self, crud, test_db, sample_lead_create, monkeypatch):
+        """Test a lead written between a bulk update's read and write is left alone and not reported"""
+        first = await crud.create(sample_lead_create)
+        second = await crud.create(LeadCreate(**{**sample_lead_create.model_dump(), "email": "other@example.com"}))
+        leads = test_db.leads
+
+        class ConcurrentWrite:
+            """The leads collection, with another writer closing the first lead just before each bulk write"""
+            def __getattr__(self, name):
+                return getattr(leads, name)
+
+            async def bulk_write(self, requests, ordered=True):
+                await leads.update_one(
+                    {"_id": ObjectId(first.id)},
+                    {"$set": {"current_stage": Stage.CLOSED_WON.value}, "$inc": {"version": 1}}
+                )
+                return await leads.bulk_write(requests, ordered=ordered)
+
+        monkeypatch.setattr(crud, "get_collection", ConcurrentWrite)
+        missing = str(ObjectId())
+        result = await crud.update_many(
+            [first.id, second.id, missing],
+            {"current_stage": Stage.NEGOTIATION.value}
+        )
+        assert result.matched == 1
+        assert result.ids == [second.id]
+
+        assert (await crud.get(first.id)).current_stage == Stage.CLOSED_WON.value
+        history, _ = await crud.get_stage_history(first.id)
+        assert history[-1].to_stage == Stage.NEW_LEAD.value
+        history, _ = await crud.get_stage_history(second.id)
+        assert history[-1].to_stage == Stage.NEGOTIATION.value
+
+        # Plain field updates by id report only the leads that exist
+        monkeypatch.undo()
+        result = await crud.update_many([second.id, missing], {"company": "Renamed"})
+        assert result.ids == [second.id]
+
+    async def test_update_matching(self, crud, test_db, sample_lead_create, monkeypatch):
+        """Test filter updates apply server-side in batches and require a filter"""
+        monkeypatch.setattr("app.crud.lead.BULK_UPDATE_BATCH_SIZE", 2)
+        leads = []
+        for i in range(5):
+            leads.append(await crud.create(LeadCreate(**{
+                **sample_lead_create.model_dump(),
+                "email": f"test{i}@example.com",
+                "current_stage": Stage.PROPOSAL_SENT.value if i < 4 else Stage.NEW_LEAD.value
+            })))
+
+        result = await crud.update_matching(
+            {"current_stage": Stage.NEGOTIATION.value},
+            current_stage=Stage.PROPOSAL_SENT.value
+        )
+        assert (result.matched, result.modified) == (4, 4)
+        for created in leads[:4]:
+            history, total = await crud.get_stage_history(created.id)
+            assert history[-1].to_stage == Stage.NEGOTIATION.value
+        assert (await crud.get(leads[4].id)).current_stage == Stage.NEW_LEAD.value
+
+        result = await crud.update_matching({"company": "Renamed"}, search="test4@")
+        assert result.matched == 1
+        assert (await crud.get(leads[4].id)).company == "Renamed"
+
+        stats = await crud.get_stats()
+        assert stats.stages[Stage.NEGOTIATION.value] == 4
+
+        with pytest.raises(ValueError):
+            await crud.update_matching({"current_stage": Stage.CLOSED_WON.value})
+
+    async def test_pipeline_stats(self, crud, test_db, sample_lead_create):
+        """Test writes keep the pipeline counters in step with the leads"""
+        await crud.create(sample_lead_create)
+        stats = await crud.get_stats()
+        assert stats.total == 1
+        assert stats.stages[Stage.NEW_LEAD.value] == 1
+
+        result = await crud.create_many([
+            LeadCreate(**{**sample_lead_create.model_dump(), "email": f"bulk{i}@example.com"})
+            for i in range(3)
+        ])
+        ids = result.inserted_ids
+        await crud.update(ids[0], {"current_stage": Stage.INITIAL_CONTACT.value, "engaged": True})
+        await crud.update_many(ids[1:], {"current_stage": Stage.NEGOTIATION.value})
+        await crud.delete(ids[2])
+
+        stats = await crud.get_stats()
+        assert stats.total == 3
+        assert stats.stages[Stage.NEW_LEAD.value] == 1
+        assert stats.stages[Stage.INITIAL_CONTACT.value] == 1
+        assert stats.stages[Stage.NEGOTIATION.value] == 1
+        assert (stats.engaged, stats.not_engaged) == (1, 2)
+
+        reconciliation = await crud.reconcile_stats()
+        assert reconciliation.drift == {}
+
+        # Counters knocked out of step are reported and rebuilt
+        await test_db.pipeline_stats.update_one({}, {"$inc": {"total": 2}})
+        reconciliation = await crud.reconcile_stats()
+        assert reconciliation.drift == {"total": 2}
+        assert (await crud.get_stats()).total == 3
+
+        # Building the counters for the first time reports no drift
+        await test_db.pipeline_stats.delete_many({})
+        reconciliation = await crud.reconcile_stats()
+        assert reconciliation.drift == {}
+        assert reconciliation.stats.stages[Stage.NEGOTIATION.value] == 1
+
+    async def test_lead_cache(self, crud, test_db, sample_lead_create):
+        """Test lead reads are cached and invalidated by writes"""
+        # The cache is opt-in
+        crud._lead_cache.maxsize = crud._email_ids.maxsize = 100
+        created = await crud.create(sample_lead_create)
+
+        first = await crud.get(created.id)
+        second = await crud.get(created.id)
+        assert second == first
+        assert crud.cache_stats()["leads"]["hits"] == 1
+
+        # Callers mutating their copy do not corrupt the cache
+        second.name = "Mutated"
+        assert (await crud.get(created.id)).name == created.name
+
+        by_email = await crud.get_by_email(created.email)
+        assert by_email.id == created.id
+        assert crud.cache_stats()["leads"]["hits"] == 3
+
+        updated = await crud.update(created.id, {"email": "changed@example.com"})
+        assert (await crud.get(created.id)).email == updated.email
+        assert await crud.get_by_email(created.email) is None
+
+        await crud.delete(created.id)
+        with pytest.raises(LeadNotFoundException):
+            await crud.get(created.id)
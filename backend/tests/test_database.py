@@ -13,4 +13,65 @@ async def test_get_database():
     """Test get_database function returns database instance"""
     from app.db.database import get_database
     db = get_database()
-    assert isinstance(db, AsyncIOMotorDatabase) 
\ No newline at end of file
+    assert isinstance(db, AsyncIOMotorDatabase)
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes(test_db):
+    """Test the index registry is applied idempotently and drift is reported"""
+    from app.db.indexes import INDEXES, ensure_indexes, verify_indexes
+
+    await ensure_indexes(test_db)
+    await ensure_indexes(test_db)
+
+    reports = await verify_indexes(test_db)
+    assert all(report.ok for report in reports)
+
+    info = await test_db.leads.index_information()
+    assert info["email_unique"]["unique"]
+    for index in INDEXES["leads"]:
+        assert index.document["name"] in info
+
+    await test_db.leads.create_index("company", name="stray_company")
+    await test_db.leads.drop_index("name_id")
+    try:
+        report = next(r for r in await verify_indexes(test_db) if r.collection == "leads")
+        assert report.missing == ["name_id"]
+        assert report.extra == ["stray_company"]
+    finally:
+        await test_db.leads.drop_index("stray_company")
+        await ensure_indexes(test_db)
+
+    # An email index that lost its unique option no longer counts as present
+    await test_db.leads.drop_index("email_unique")
+    await test_db.leads.create_index("email", name="email_unique")
+    try:
+        report = next(r for r in await verify_indexes(test_db) if r.collection == "leads")
+        assert report.missing == ["email_unique"]
+    finally:
+        await test_db.leads.drop_index("email_unique")
+        await ensure_indexes(test_db)
+
+def test_pool_metrics():
+    """Test pool events are turned into in-use, waiting and checkout-wait gauges"""
+    from pymongo import monitoring
+    from app.db.pool import PoolMetrics
+
+    address = ("localhost", 27017)
+    metrics = PoolMetrics()
+    metrics.connection_created(monitoring.ConnectionCreatedEvent(address, 1))
+    for _ in range(3):
+        metrics.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+    metrics.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1, 0.25))
+    metrics.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(address, "timeout", 0.5))
+
+    snapshot = metrics.snapshot()
+    assert snapshot["open"] == 1
+    assert snapshot["in_use"] == 1
+    assert snapshot["waiting"] == 1
+    assert snapshot["checkout_failures"] == {"timeout": 1}
+    assert snapshot["checkout_wait_seconds_total"] == 0.75
+    assert snapshot["checkout_wait_seconds_max"] == 0.5
+
+    metrics.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+    assert metrics.snapshot()["in_use"] == 0
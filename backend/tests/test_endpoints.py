@@ -38,4 +38,60 @@ async def test_get_leads(client, crud, sample_lead_create):
     assert response.status_code == 200
     data = response.json()
     assert "items" in data
-    assert len(data["items"]) > 0 
\ No newline at end of file
+    assert len(data["items"]) > 0
+
+
+def test_get_leads_empty_page_has_no_body(client):
+    """Test an empty page is a 204 without a body"""
+    response = client.get(f"{settings.API_V1_STR}/leads/", params={"search": "no-such-lead-4f9c2"})
+    assert response.status_code == 204
+    assert response.content == b""
+    assert response.headers.get("content-length") in (None, "0")
+
+
+def test_get_leads_rejects_unknown_fields(client):
+    """Test the list endpoint validates selected fields"""
+    response = client.get(f"{settings.API_V1_STR}/leads/", params={"fields": "name,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+def test_export_leads_rejects_unknown_fields(client):
+    """Test export validates the requested columns before streaming"""
+    response = client.get(f"{settings.API_V1_STR}/leads/export", params={"fields": "name,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+def test_export_leads(client):
+    """Test leads export endpoint streams CSV and NDJSON"""
+    response = client.get(f"{settings.API_V1_STR}/leads/export", params={"fields": "name,email"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[0] == "name,email"
+
+    response = client.get(f"{settings.API_V1_STR}/leads/export", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+def test_export_leads_fails_mid_stream(client, monkeypatch):
+    """Test a database error during an export aborts the response instead of ending it"""
+    from app.crud.lead import lead
+
+    async def failing_stream(**kwargs):
+        yield {"name": "Aria Frost", "email": "aria.frost@prism.com"}
+        raise RuntimeError("cursor lost")
+
+    errors = []
+    monkeypatch.setattr(lead, "stream", failing_stream)
+    monkeypatch.setattr("app.core.export.logger.error", errors.append)
+    # The error reaches the server (wrapped in an ExceptionGroup by Starlette) after the 200 was sent
+    with pytest.raises(Exception):
+        client.get(f"{settings.API_V1_STR}/leads/export", params={"fields": "name,email"})
+    assert len(errors) == 1 and "cursor lost" in errors[0]
+
+def test_get_lead_history_limits_page_size(client):
+    """Test stage history pages are capped"""
+    response = client.get(
+        f"{settings.API_V1_STR}/leads/507f1f77bcf86cd799439011/history",
+        params={"page_size": 101}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,25 @@
+import json
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from app.core.json import ModelJSONResponse, json_dumps
+from app.models.enums import Stage
+from app.models.lead import LeadBulkUpdateResponse
+
+def test_json_dumps_handles_stored_types():
+    """Test datetimes, enums and ObjectIds encode like the API returns them"""
+    id = ObjectId()
+    encoded = json_dumps({"id": id, "at": datetime(2024, 1, 2, 3, 4, 5), "stage": Stage.NEGOTIATION})
+    assert json.loads(encoded) == {"id": str(id), "at": "2024-01-02T03:04:05", "stage": "Negotiation"}
+
+def test_json_dumps_rejects_unknown_types():
+    """Test values with no JSON form raise instead of being silently stringified"""
+    with pytest.raises(Exception):
+        json_dumps({"value": object()})
+
+def test_model_json_response_encodes_models():
+    """Test a model is encoded directly into the response body"""
+    response = ModelJSONResponse(LeadBulkUpdateResponse(matched=1, modified=1, ids=["a"]), status_code=201)
+    assert response.status_code == 201
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"matched": 1, "modified": 1, "ids": ["a"]}
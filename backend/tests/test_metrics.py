@@ -0,0 +1,66 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+from app.core.metrics import MetricsRegistry
+from app.db.commands import returned_documents
+
+def test_render_prometheus_text():
+    """Test counters, gauges and histograms render in the Prometheus text format"""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    connections = registry.gauge("connections", "Connections")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    connections.inc()
+    connections.inc()
+    connections.dec()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a\\"b"} 3' in lines
+    assert "connections 1" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+
+    with pytest.raises(ValueError):
+        requests.inc(status="200")
+
+def test_returned_documents():
+    """Test documents are counted from cursor batches and findAndModify replies"""
+    assert returned_documents({"cursor": {"firstBatch": [{}, {}], "id": 0}}) == 2
+    assert returned_documents({"cursor": {"nextBatch": [{}], "id": 0}}) == 1
+    assert returned_documents({"value": {"_id": 1}, "ok": 1}) == 1
+    assert returned_documents({"n": 5, "ok": 1}) == 0
+
+def test_metrics_endpoint_labels_route_templates():
+    """Test requests are recorded by route template and exposed at /metrics"""
+    client = TestClient(app)
+    client.get("/health")
+    client.get(f"{settings.API_V1_STR}/leads/507f1f77bcf86cd799439011/history", params={"page_size": 101})
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    assert f'route="{settings.API_V1_STR}/leads/{{lead_id}}/history",status="422"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert "http_request_duration_seconds_bucket" in body
+    assert "mongodb_pool_connections_in_use" in body
+    assert "# TYPE mongodb_pool_cleared_total counter" in body
+
+def test_cache_counters_are_exported():
+    """Test the CRUD cache counters are exposed at /metrics"""
+    lines = TestClient(app).get("/metrics").text.splitlines()
+    assert "# TYPE lead_cache_hits_total counter" in lines
+    assert any(line.startswith('lead_cache_misses_total{cache="counts"} ') for line in lines)
+    assert any(line.startswith('lead_cache_entries{cache="leads"} ') for line in lines)
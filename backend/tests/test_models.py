@@ -1,5 +1,5 @@
 import pytest
-from app.models.lead import Lead, LeadCreate, LeadUpdate
+from app.models.lead import Lead, LeadCreate, LeadUpdate, LeadBulkUpdate
 from app.models.enums import Stage, EngagementStatus
 from datetime import datetime, UTC
 from pydantic import ValidationError
@@ -36,4 +36,49 @@ def test_lead_stage_validation():
     
     with pytest.raises(ValidationError) as exc_info:
         LeadCreate(**lead_data)
-    assert "current_stage" in str(exc_info.value)  # Verify error is about stage 
\ No newline at end of file
+    assert "current_stage" in str(exc_info.value)  # Verify error is about stage 
+
+def test_lead_from_document_skips_validation():
+    """Test stored documents are read without re-validation"""
+    now = datetime.now(UTC)
+    doc = {
+        "id": "507f1f77bcf86cd799439011",
+        "name": "Test Lead",
+        "email": "test@example.com",
+        "company": "Test Co",
+        "created_at": now,
+        "updated_at": now
+    }
+    lead = Lead.from_document(doc)
+    assert lead.email == "test@example.com"
+    assert lead.current_stage == Stage.NEW_LEAD.value
+    assert lead.version == 0
+
+    # Documents missing required fields are validated instead
+    with pytest.raises(ValidationError):
+        Lead.from_document({key: value for key, value in doc.items() if key != "created_at"})
+
+def test_lead_update_validates_dates():
+    """Test update input is validated before it is written"""
+    update = LeadUpdate(stage_updated_at="2024-01-01T00:00:00")
+    assert update.stage_updated_at == datetime(2024, 1, 1)
+
+    with pytest.raises(ValidationError):
+        LeadUpdate(last_contacted="not a date")
+
+
+def test_lead_update_matches_lead_limits():
+    """Test updates can't store fields a Lead would reject"""
+    for fields in ({"name": ""}, {"company": "x" * 101}, {"status": "x" * 51}):
+        with pytest.raises(ValidationError):
+            LeadUpdate(**fields)
+    assert LeadUpdate(name="x" * 100).name == "x" * 100
+
+
+def test_bulk_update_requires_a_filter_field():
+    """Test an empty filter can't select every lead"""
+    with pytest.raises(ValidationError):
+        LeadBulkUpdate(filter={}, stage=Stage.CLOSED_WON)
+
+    update = LeadBulkUpdate(filter={"engaged": True}, stage=Stage.CLOSED_WON)
+    assert update.update_data() == {"current_stage": Stage.CLOSED_WON.value}
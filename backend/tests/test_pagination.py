@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from app.core.pagination import encode_cursor, decode_cursor, build_keyset_filter, merge_filters
+from app.core.exceptions import InvalidCursorException
+
+def test_cursor_round_trip():
+    """Test cursors round-trip sort values of every stored type"""
+    last_id = ObjectId()
+    for value in ["Test Lead", datetime(2024, 5, 1, 12, 30), None]:
+        cursor = encode_cursor("name", True, value, last_id)
+        assert decode_cursor(cursor, "name", True) == (value, last_id)
+
+def test_cursor_rejects_other_sort():
+    """Test a cursor is only valid for the sort it was issued for"""
+    cursor = encode_cursor("name", True, "Test Lead", ObjectId())
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, "company", True)
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(cursor, "name", False)
+
+def test_cursor_rejects_garbage():
+    """Test malformed cursors are rejected"""
+    for cursor in ["not-a-cursor", "e30", "!!!"]:
+        with pytest.raises(InvalidCursorException):
+            decode_cursor(cursor, "name", True)
+
+def test_keyset_filter_null_values():
+    """Test null sort values sort first ascending and last descending"""
+    last_id = ObjectId()
+    assert build_keyset_filter("last_contacted", True, None, last_id) == {
+        "last_contacted": None, "_id": {"$lt": last_id}
+    }
+    ascending = build_keyset_filter("last_contacted", False, None, last_id)
+    assert {"last_contacted": {"$ne": None}} in ascending["$or"]
+
+def test_merge_filters():
+    """Test filter merging drops empty filters"""
+    assert merge_filters({}, None) == {}
+    assert merge_filters({"a": 1}, {}) == {"a": 1}
+    assert merge_filters({"a": 1}, {"b": 2}) == {"$and": [{"a": 1}, {"b": 2}]}
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from pymongo import monitoring
+from app.db.slow_queries import COLLSCANS, SlowQueryDetector, query_shape, summarize_explain
+
+COLLSCAN_EXPLAIN = {
+    "queryPlanner": {
+        "winningPlan": {
+            "stage": "SORT",
+            "inputStage": {"stage": "COLLSCAN", "filter": {"name": {"$regex": "acme"}}}
+        }
+    },
+    "executionStats": {"nReturned": 3, "totalDocsExamined": 5000, "totalKeysExamined": 0}
+}
+
+class FakeClient:
+    """Records explain commands in place of the synchronous MongoClient"""
+    def __init__(self):
+        self.commands = []
+
+    def __getitem__(self, name):
+        return self
+
+    def command(self, command):
+        self.commands.append(command)
+        return COLLSCAN_EXPLAIN
+
+def test_query_shape_hides_values():
+    """Test queries differing only in their values share a shape"""
+    def find(term, ids):
+        return {
+            "find": "leads",
+            "filter": {"$or": [{"name": {"$regex": term, "$options": "i"}}], "_id": {"$in": ids}},
+            "sort": {"created_at": -1},
+            "lsid": {"id": term}
+        }
+    assert query_shape(find("acme", [1, 2])) == query_shape(find("globex", [3]))
+    assert "acme" not in query_shape(find("acme", [1]))
+
+def test_summarize_explain():
+    """Test the winning plan, counters and collection scans are read from explain output"""
+    summary = summarize_explain(COLLSCAN_EXPLAIN)
+    assert summary == {
+        "plan": "SORT > COLLSCAN",
+        "docs_examined": 5000,
+        "keys_examined": 0,
+        "n_returned": 3,
+        "collscan": True
+    }
+
+    indexed = {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "name_id"}}}}
+    assert summarize_explain(indexed)["plan"] == "FETCH > IXSCAN(name_id)"
+    assert not summarize_explain(indexed)["collscan"]
+
+def test_slow_reads_are_explained_once_per_shape():
+    """Test only slow monitored reads are explained, in the background, once per shape"""
+    detector = SlowQueryDetector(threshold_ms=100, sample_rate=1.0)
+    detector.client = FakeClient()
+    before = COLLSCANS.value(collection="leads")
+
+    def run(request_id, command, duration_ms):
+        address = ("localhost", 27017)
+        detector.started(monitoring.CommandStartedEvent(
+            {**command, "$db": "leads_db", "lsid": {"id": request_id}}, "leads_db", request_id, address, request_id
+        ))
+        detector.succeeded(monitoring.CommandSucceededEvent(
+            timedelta(milliseconds=duration_ms), {"ok": 1}, next(iter(command)), request_id, address, request_id,
+            database_name="leads_db"
+        ))
+
+    run(1, {"find": "leads", "filter": {"name": "a"}}, 5)
+    run(2, {"find": "leads", "filter": {"name": "b"}}, 250)
+    run(3, {"find": "leads", "filter": {"name": "c"}}, 250)
+    run(4, {"insert": "leads", "documents": [{}]}, 250)
+    detector._executor.shutdown(wait=True)
+
+    assert detector.client.commands == [
+        {"explain": {"find": "leads", "filter": {"name": "b"}}, "verbosity": "executionStats"}
+    ]
+    assert COLLSCANS.value(collection="leads") == before + 1
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from app.models.enums import Stage
+from app.models.lead import Lead, LeadSubscription
+from app.websocket.connection import ConnectionManager
+from app.websocket.backplane import InMemoryBackplane, MongoBackplane
+from app.websocket.subscriptions import ChangeScope, Subscription
+
+class FakeWebSocket:
+    """In-memory stand-in for a client socket"""
+    def __init__(self, block: bool = False, fail: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.block = block
+        self.fail = fail
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        if self.block:
+            await asyncio.Event().wait()
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+async def drain():
+    """Let writer tasks run"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_client():
+    """Test a broadcast is delivered to all connected clients"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    sockets = [FakeWebSocket() for _ in range(3)]
+    for i, socket in enumerate(sockets):
+        await manager.connect(socket, f"client-{i}")
+
+    await manager.broadcast_bulk_change(["a", "b"], "create", "user-1")
+    await drain()
+
+    for socket in sockets:
+        assert socket.sent == [{
+            "type": "bulk_create", "leadIds": ["a", "b"], "count": 2, "userId": "user-1", "isRemote": True
+        }]
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted():
+    """Test a client that stops reading is disconnected without delaying others"""
+    manager = ConnectionManager(queue_size=2, send_timeout=60, coalesce_window=0)
+    slow, fast = FakeWebSocket(block=True), FakeWebSocket()
+    await manager.connect(slow, "slow")
+    await manager.connect(fast, "fast")
+
+    for i in range(4):
+        await manager.broadcast_bulk_change([str(i)], "update", "user-1")
+        await drain()
+
+    assert "slow" not in manager.active_connections
+    assert slow.closed_with == 1013
+    assert [message["leadIds"] for message in fast.sent] == [["0"], ["1"], ["2"], ["3"]]
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_slow_consumer_drop_oldest():
+    """Test the drop_oldest policy keeps the client and discards stale messages"""
+    manager = ConnectionManager(queue_size=1, send_timeout=60, slow_consumer_policy="drop_oldest", coalesce_window=0)
+    slow = FakeWebSocket(block=True)
+    await manager.connect(slow, "slow")
+
+    for i in range(3):
+        await manager.broadcast_bulk_change([str(i)], "update", "user-1")
+        await drain()
+
+    connection = manager.active_connections["slow"]
+    assert connection.dropped == 1
+    assert json.loads(connection.queue.get_nowait())["leadIds"] == ["2"]
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_failed_send_removes_client():
+    """Test a client whose send fails is removed"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    await manager.connect(FakeWebSocket(fail=True), "broken")
+
+    await manager.broadcast_bulk_change(["a"], "delete", "user-1")
+    await drain()
+
+    assert manager.active_connections == {}
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_reconnect_replaces_previous_socket():
+    """Test a stale disconnect does not remove the client's new socket"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    old, new = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(old, "client")
+    await manager.connect(new, "client")
+
+    manager.disconnect("client", old)
+    assert manager.active_connections["client"].websocket is new
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_backplane_reaches_other_workers():
+    """Test broadcasts reach clients of every manager sharing a backplane, once"""
+    backplane = InMemoryBackplane()
+    workers = [ConnectionManager(queue_size=4, send_timeout=1, backplane=backplane, coalesce_window=0) for _ in range(2)]
+    sockets = [FakeWebSocket(), FakeWebSocket()]
+    for i, (worker, socket) in enumerate(zip(workers, sockets)):
+        await worker.start()
+        await worker.connect(socket, f"client-{i}")
+
+    await workers[0].broadcast_bulk_change(["a"], "update", "user-1")
+    await drain()
+
+    for socket in sockets:
+        assert [message["leadIds"] for message in socket.sent] == [["a"]]
+    for worker in workers:
+        await worker.shutdown()
+
+def make_lead(**overrides) -> Lead:
+    data = {
+        "id": "507f1f77bcf86cd799439011",
+        "name": "Test User",
+        "email": "test@example.com",
+        "company": "Test Company",
+        "current_stage": Stage.NEW_LEAD,
+        "version": 1,
+        "created_at": datetime(2024, 1, 1),
+        "updated_at": datetime(2024, 1, 1),
+    }
+    data.update(overrides)
+    return Lead(**data)
+
+@pytest.mark.asyncio
+async def test_update_sends_only_changed_fields():
+    """Test an update message carries the changed fields instead of the whole lead"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    socket = FakeWebSocket()
+    await manager.connect(socket, "client")
+
+    await manager.broadcast_lead_change(
+        make_lead(company="New Co", version=2), "update", "user-1", changed_fields=["company", "version"]
+    )
+    await drain()
+
+    assert socket.sent == [{
+        "type": "update",
+        "id": "507f1f77bcf86cd799439011",
+        "version": 2,
+        "changes": {"company": "New Co", "version": 2},
+        "userId": "user-1",
+        "isRemote": True
+    }]
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_burst_is_coalesced():
+    """Test changes within the window go out as one frame, merged per lead"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0.05)
+    socket = FakeWebSocket()
+    await manager.connect(socket, "client")
+
+    await manager.broadcast_lead_change(make_lead(version=1), "create", "user-1")
+    await manager.broadcast_lead_change(
+        make_lead(company="New Co", version=2), "update", "user-1", changed_fields=["company", "version"]
+    )
+    await manager.broadcast_lead_change(
+        make_lead(id="507f1f77bcf86cd799439012", engaged=True, version=5), "update", "user-2",
+        changed_fields=["engaged", "version"]
+    )
+    await manager.broadcast_lead_change(
+        make_lead(id="507f1f77bcf86cd799439012", name="Renamed", version=6), "update", "user-2",
+        changed_fields=["name", "version"]
+    )
+    await drain()
+    assert socket.sent == []
+
+    await asyncio.sleep(0.1)
+    await drain()
+
+    assert len(socket.sent) == 1
+    frame = socket.sent[0]
+    assert frame["type"] == "batch"
+    created, updated = frame["events"]
+    assert created["type"] == "create"
+    assert created["version"] == 2
+    assert created["lead"]["company"] == "New Co"
+    assert updated["changes"] == {"engaged": True, "name": "Renamed", "version": 6}
+    assert updated["version"] == 6
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_shutdown_flushes_pending_changes():
+    """Test changes still in the window are sent on shutdown"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=60)
+    socket = FakeWebSocket()
+    await manager.connect(socket, "client")
+
+    await manager.broadcast_lead_change(make_lead(), "delete", "user-1")
+    await manager.flush()
+    await drain()
+
+    assert socket.sent == [{
+        "type": "delete",
+        "id": "507f1f77bcf86cd799439011",
+        "version": 1,
+        "lead": {"id": "507f1f77bcf86cd799439011", "name": "Test User"},
+        "userId": "user-1",
+        "isRemote": True
+    }]
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_subscription_filters_changes():
+    """Test clients only receive changes matching their subscription"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    sockets = {name: FakeWebSocket() for name in ("all", "negotiation", "acme", "lead")}
+    for name, socket in sockets.items():
+        await manager.connect(socket, name)
+    manager.subscribe("negotiation", LeadSubscription(stages=[Stage.NEGOTIATION]))
+    manager.subscribe("acme", LeadSubscription(search="acme", engaged=True))
+    manager.subscribe("lead", LeadSubscription(leadIds=["507f1f77bcf86cd799439012"]))
+
+    await manager.broadcast_lead_change(make_lead(), "create", "user-1")
+    await manager.broadcast_lead_change(
+        make_lead(id="507f1f77bcf86cd799439012", company="Acme Corp", engaged=True), "create", "user-1"
+    )
+    await drain()
+
+    received = {name: [message["id"] for message in socket.sent] for name, socket in sockets.items()}
+    assert received == {
+        "all": ["507f1f77bcf86cd799439011", "507f1f77bcf86cd799439012"],
+        "negotiation": [],
+        "acme": ["507f1f77bcf86cd799439012"],
+        "lead": ["507f1f77bcf86cd799439012"]
+    }
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_subscription_sees_leads_leaving_view():
+    """Test a stage change reaches clients following the stage the lead left"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    socket = FakeWebSocket()
+    await manager.connect(socket, "client")
+    manager.subscribe("client", LeadSubscription(stages=[Stage.NEW_LEAD]))
+
+    moved = make_lead(current_stage=Stage.INITIAL_CONTACT)
+    await manager.broadcast_lead_change(
+        moved, "update", "user-1", changed_fields=["current_stage"], previous_stage=Stage.NEW_LEAD
+    )
+    await manager.broadcast_lead_change(moved, "update", "user-1", changed_fields=["company"])
+    await drain()
+
+    assert [message["changes"] for message in socket.sent] == [{"current_stage": Stage.INITIAL_CONTACT}]
+    await manager.shutdown()
+
+def test_subscription_search_is_literal():
+    """Test a subscription's search is a case-insensitive substring, never a regex"""
+    subscription = Subscription.from_model(LeadSubscription(search="(a|a)+$"))
+    assert not subscription.matches(ChangeScope.for_lead(make_lead(name="a" * 26 + "!")))
+    assert subscription.matches(ChangeScope.for_lead(make_lead(name="Odd (A|A)+$ Name")))
+
+    subscription = Subscription.from_model(LeadSubscription(search="ACME"))
+    assert subscription.matches(ChangeScope.for_lead(make_lead(company="Acme Corp")))
+
+@pytest.mark.asyncio
+async def test_batch_is_filtered_per_client():
+    """Test each client's batch only holds the events it subscribed to"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=60)
+    everything, one = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(everything, "everything")
+    await manager.connect(one, "one")
+    manager.subscribe("one", LeadSubscription(leadIds=["507f1f77bcf86cd799439011"]))
+
+    await manager.broadcast_lead_change(make_lead(), "create", "user-1")
+    await manager.broadcast_lead_change(make_lead(id="507f1f77bcf86cd799439012"), "create", "user-1")
+    await manager.flush()
+    await drain()
+
+    assert len(everything.sent[0]["events"]) == 2
+    assert one.sent[0]["id"] == "507f1f77bcf86cd799439011"
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_filter_bulk_change_reaches_every_subscription():
+    """Test a bulk change without lead ids is delivered to clients following specific leads"""
+    manager = ConnectionManager(queue_size=4, send_timeout=1, coalesce_window=0)
+    socket = FakeWebSocket()
+    await manager.connect(socket, "one")
+    manager.subscribe("one", LeadSubscription(leadIds=["507f1f77bcf86cd799439011"]))
+
+    await manager.broadcast_bulk_change(None, "update", "user-1", count=5000)
+    await drain()
+
+    assert socket.sent == [{"type": "bulk_update", "count": 5000, "userId": "user-1", "isRemote": True}]
+    await manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_mongo_backplane(test_db):
+    """Test the MongoDB backplane relays messages between subscribers"""
+    await test_db.drop_collection("broadcast_events_test")
+    backplane = MongoBackplane(test_db, collection_name="broadcast_events_test", retry_interval=0.05)
+    received = []
+    try:
+        sender = await backplane.subscribe(lambda message: received.append(("sender", message)))
+        await backplane.subscribe(lambda message: received.append(("receiver", message)))
+
+        await backplane.publish("hello", sender)
+        for _ in range(100):
+            if received:
+                break
+            await asyncio.sleep(0.05)
+
+        assert received == [("receiver", "hello")]
+    finally:
+        await backplane.close()
+        await test_db.drop_collection("broadcast_events_test")
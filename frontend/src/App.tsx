@@ -16,13 +16,22 @@ function App() {
       if (message.isRemote) {
         switch (message.type) {
           case 'create':
-            showToast.info(`New lead created: ${message.lead.name}`)
+            showToast.info(`New lead created: ${message.lead?.name}`)
             break
-          case 'update':
-            showToast.info(`Lead updated: ${message.lead.name}`)
+          case 'update': {
+            // Updates carry only the fields that changed
+            const name = message.lead?.name ?? message.changes?.name
+            showToast.info(name ? `Lead updated: ${name}` : 'Lead updated')
             break
+          }
           case 'delete':
-            showToast.warning(`Lead deleted: ${message.lead.name}`)
+            showToast.warning(`Lead deleted: ${message.lead?.name}`)
+            break
+          case 'bulk_create':
+            showToast.info(`${message.count} new leads imported`)
+            break
+          case 'bulk_update':
+            showToast.info(`${message.count} leads updated`)
             break
         }
       }
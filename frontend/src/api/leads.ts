@@ -1,5 +1,5 @@
 import { api } from './axios';
-import { Lead, LeadCreate, LeadUpdate, LeadFilters } from '../types/lead';
+import { Lead, LeadCreate, LeadUpdate, LeadFilters, LeadSummary, StageEvent } from '../types/lead';
 import { websocketService } from '../services/websocket'
 
 interface PaginatedResponse<T> {
@@ -22,7 +22,22 @@ export const leadsApi = {
       ...(search && { search }),
     });
 
-    const { data } = await api.get<PaginatedResponse<Lead>>(`/leads/?${params}`);
+    const { data } = await api.get<PaginatedResponse<LeadSummary>>(`/leads/?${params}`);
+    return data;
+  },
+
+  getLead: async (id: string) => {
+    const { data } = await api.get<Lead>(`/leads/${id}`);
+    return data;
+  },
+
+  getLeadHistory: async (id: string, page = 1, pageSize = 100) => {
+    const params = new URLSearchParams({
+      page: page.toString(),
+      page_size: pageSize.toString(),
+    });
+
+    const { data } = await api.get<PaginatedResponse<StageEvent>>(`/leads/${id}/history?${params}`);
     return data;
   },
 
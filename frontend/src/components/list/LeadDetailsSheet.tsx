@@ -4,7 +4,7 @@ import type {  LeadUpdate } from '../../types/lead'
 import { Sheet, SheetContent, SheetHeader, SheetTitle } from '../common/Sheet'
 import { format, parseISO } from 'date-fns'
 import {  Mail, Building2, Calendar, X } from 'lucide-react'
-import { useLeads } from '../../hooks/useLeads'
+import { useLeads, useLeadHistory } from '../../hooks/useLeads'
 import "react-datepicker/dist/react-datepicker.css"
 import StageHistoryTimeline from '../timeline/StageHistoryTimeline'
 import { useStageHistory } from '../../hooks/useStageHistory'
@@ -23,8 +23,9 @@ export default function LeadDetailsSheet({ lead, isOpen, onClose }: LeadDetailsS
   const { updateLead } = useLeads({ page: 1 })
   const [isUpdating, setIsUpdating] = useState(false)
   
-  // Initialize stage history from lead data
-  const { stageHistory, editStageDate } = useStageHistory(lead?.stage_history || [])
+  // Stage history is stored apart from the lead; fetch it while the sheet is open
+  const { data: history } = useLeadHistory(lead?.id ?? '', !!lead && isOpen)
+  const { stageHistory, editStageDate } = useStageHistory(history?.items || [])
 
   // Handle saving stage date changes
   const handleSaveStageDate = async (index: number, newDate: Date) => {
@@ -46,7 +47,6 @@ export default function LeadDetailsSheet({ lead, isOpen, onClose }: LeadDetailsS
         engaged: lead.engaged,
         last_contacted: lead.last_contacted,
         status: lead.status,
-        stage_history: stageHistory,
         stage_updated_at: isLatestStage ? newChangedAt : lead.stage_updated_at
       }
 
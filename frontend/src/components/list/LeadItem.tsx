@@ -1,15 +1,15 @@
 import { format } from 'date-fns'
-import { Lead, LeadUpdate } from '../../types/lead'
+import { LeadSummary, LeadUpdate } from '../../types/lead'
 import { Trash2, Edit2, ChevronRight, MoreVertical, Clock, CheckCircle } from 'lucide-react'
 import { useState, useRef, useEffect } from 'react'
 import ConfirmDialog from '../common/ConfirmDialog'
 import StageProgress from '../progress/StageProgress'
 import LeadDetailsSheet from './LeadDetailsSheet'
 import EditLeadModal from '../modals/EditLeadModal'
-import { useLeads } from '../../hooks/useLeads'
+import { useLead, useLeads } from '../../hooks/useLeads'
 
 interface LeadItemProps {
-  lead: Lead
+  lead: LeadSummary
   onDelete: (id: string) => void
   isMobile: boolean
   isSelected?: boolean
@@ -29,6 +29,8 @@ export default function LeadItem({ lead, onDelete, isMobile, isSelected, onSelec
   
   const menuRef = useRef<HTMLDivElement>(null)
   const { updateLead } = useLeads({ page: 1 })
+  // The list only carries a summary; load the full lead when it is opened
+  const { data: fullLead } = useLead(lead.id, showDetails || showEditModal)
 
   // Close dropdown menu when clicking outside
   useEffect(() => {
@@ -174,18 +176,20 @@ export default function LeadItem({ lead, onDelete, isMobile, isSelected, onSelec
             cancelText="Cancel"
           />
 
-          <EditLeadModal
-            lead={lead}
-            isOpen={showEditModal}
-            onClose={() => {
-              setShowEditModal(false)
-            }}
-            onSubmit={handleEditSubmit}
-            isLoading={false}
-          />
+          {fullLead && (
+            <EditLeadModal
+              lead={fullLead}
+              isOpen={showEditModal}
+              onClose={() => {
+                setShowEditModal(false)
+              }}
+              onSubmit={handleEditSubmit}
+              isLoading={false}
+            />
+          )}
 
           <LeadDetailsSheet 
-            lead={lead}
+            lead={fullLead ?? null}
             isOpen={showDetails}
             onClose={() => setShowDetails(false)}
           />
@@ -303,18 +307,20 @@ export default function LeadItem({ lead, onDelete, isMobile, isSelected, onSelec
         cancelText="Cancel"
       />
 
-      <EditLeadModal
-        lead={lead}
-        isOpen={showEditModal}
-        onClose={() => {
-          setShowEditModal(false)
-        }}
-        onSubmit={handleEditSubmit}
-        isLoading={false}
-      />
+      {fullLead && (
+        <EditLeadModal
+          lead={fullLead}
+          isOpen={showEditModal}
+          onClose={() => {
+            setShowEditModal(false)
+          }}
+          onSubmit={handleEditSubmit}
+          isLoading={false}
+        />
+      )}
 
       <LeadDetailsSheet 
-        lead={lead}
+        lead={fullLead ?? null}
         isOpen={showDetails}
         onClose={() => setShowDetails(false)}
       />
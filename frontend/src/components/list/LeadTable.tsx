@@ -1,4 +1,4 @@
-import { Lead } from '../../types/lead'
+import { Lead, LeadSummary } from '../../types/lead'
 import LeadItem from './LeadItem'
 import { useState, useEffect, useRef, useMemo } from 'react'
 import { debounce } from 'lodash'
@@ -12,7 +12,7 @@ import LoadingSpinner from '../common/LoadingSpinner'
 import Pagination from '../common/Pagination'
 
 interface LeadTableProps {
-  initialLeads: Lead[]
+  initialLeads: LeadSummary[]
   isLoading: boolean
   totalLeads: number
   currentPage: number
@@ -57,7 +57,7 @@ export default function LeadTable({
   // State for search and selected leads
   const [searchTerm, setSearchTerm] = useState('')
   const searchInputRef = useRef<HTMLInputElement>(null)
-  const [leads, setLeads] = useState<Lead[]>(initialLeads)
+  const [leads, setLeads] = useState<LeadSummary[]>(initialLeads)
   const [selectedLead, setSelectedLead] = useState<Lead | null>(null)
   const [showMobileMenu, setShowMobileMenu] = useState<string | null>(null)
   const [selectedLeads, setSelectedLeads] = useState<Set<string>>(new Set())
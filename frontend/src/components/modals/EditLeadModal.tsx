@@ -3,7 +3,6 @@ import { X } from 'lucide-react'
 import { Lead, LeadStage, LeadUpdate } from '../../types/lead'
 import DatePicker from 'react-datepicker'
 import "react-datepicker/dist/react-datepicker.css"
-import { useStageHistory } from '../../hooks/useStageHistory'
 import { LEAD_STAGES } from '../../constants/leads'
 import StageProgressBar from '../progress/StageProgressBar'
 import StageStep from '../progress/StageStep'
@@ -43,8 +42,6 @@ export default function EditLeadModal({ lead, isOpen, onClose, onSubmit, isLoadi
     setLastContacted,
   } = useLeadForm({ initialData: lead })
 
-  // Track stage history changes
-  const { stageHistory, updateStageHistory } = useStageHistory(lead.stage_history)
   const [initialStage] = useState<LeadStage>(lead.current_stage)
 
   // Update form when lead data changes
@@ -57,10 +54,9 @@ export default function EditLeadModal({ lead, isOpen, onClose, onSubmit, isLoadi
     setLastContacted(new Date(lead.last_contacted))
   }, [lead])
 
-  // Handle stage changes and update history
+  // The server records the transition when the update changes the stage
   const handleStageChange = (newStage: LeadStage) => {
     setCurrentStage(newStage)
-    updateStageHistory(currentStage, newStage)
   }
 
   const handleEmailValidation = (email: string): boolean => {
@@ -78,7 +74,6 @@ export default function EditLeadModal({ lead, isOpen, onClose, onSubmit, isLoadi
     
     try {
       console.log('EditLeadModal handleSubmit - Initial lead:', lead);
-      const now = new Date().toISOString()
       const updateData: LeadUpdate = {
         name,
         email,
@@ -88,12 +83,8 @@ export default function EditLeadModal({ lead, isOpen, onClose, onSubmit, isLoadi
         last_contacted: lastContacted.toISOString()
       }
 
-      // If stage has changed, add stage history
       if (currentStage !== initialStage) {
         console.log('Stage changed from', initialStage, 'to', currentStage);
-        console.log('Current stage history:', stageHistory);
-        updateData.stage_history = stageHistory
-        updateData.stage_updated_at = now
       }
 
       console.log('Submitting update data:', updateData);
@@ -12,9 +12,10 @@
  */
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { leadsApi } from '../api/leads';
-import { LeadCreate, LeadUpdate, LeadFilters, Lead } from '../types/lead';
+import { LeadCreate, LeadUpdate, LeadFilters, Lead, LeadSummary } from '../types/lead';
 import { useCallback, useEffect, useState } from 'react';
 import { showToast } from '../utils/toast';
+import { websocketService } from '../services/websocket';
 
 interface PaginatedResponse<T> {
   items: T[];
@@ -30,7 +31,7 @@ interface UpdateLeadParams {
 }
 
 interface UseLeadsReturn {
-  leads: Lead[];
+  leads: LeadSummary[];
   totalLeads: number;
   currentPage: number;
   pageSize: number;
@@ -54,7 +55,7 @@ export function useLeads(initialFilters: LeadFilters): UseLeadsReturn {
 
   // Main query for fetching leads
   const query = useQuery({
-    queryKey: ['leads', filters],
+    queryKey: ['leads', 'list', filters],
     queryFn: () => leadsApi.getLeads(filters),
     staleTime: 1000 * 60,
     placeholderData: (previousData) => {
@@ -69,7 +70,7 @@ export function useLeads(initialFilters: LeadFilters): UseLeadsReturn {
     if (filters.page && filters.page < (query.data?.total_pages ?? 0)) {
       const nextPage = filters.page + 1;
       queryClient.prefetchQuery({
-        queryKey: ['leads', { ...filters, page: nextPage }],
+        queryKey: ['leads', 'list', { ...filters, page: nextPage }],
         queryFn: () => leadsApi.getLeads({ ...filters, page: nextPage }),
       });
     }
@@ -80,6 +81,11 @@ export function useLeads(initialFilters: LeadFilters): UseLeadsReturn {
     prefetchNextPage();
   }, [prefetchNextPage]);
 
+  // Only receive live changes for leads matching the search
+  useEffect(() => {
+    websocketService.setSubscription(filters.search ? { search: filters.search } : {});
+  }, [filters.search]);
+
   // Mutations for CRUD operations
   const createMutation = useMutation({
     mutationFn: (newLead: LeadCreate) => leadsApi.createLead(newLead),
@@ -111,37 +117,31 @@ export function useLeads(initialFilters: LeadFilters): UseLeadsReturn {
 
   const updateLead = useMutation({
     mutationFn: async ({ id, data }: { id: string; data: LeadUpdate }) => {
-      const updateData = {
-        ...data,
-        ...(data.stage_history && { 
-          stage_history: data.stage_history,
-          stage_updated_at: data.stage_updated_at 
-        })
-      };
-      
-      return await leadsApi.updateLead(id, updateData);
+      return await leadsApi.updateLead(id, data);
     },
     onSuccess: (updatedLead) => {
-      queryClient.setQueriesData<PaginatedResponse<Lead>>(
-        { queryKey: ['leads'] },
-        (old: PaginatedResponse<Lead> | undefined) => {
+      queryClient.setQueriesData<PaginatedResponse<LeadSummary>>(
+        { queryKey: ['leads', 'list'] },
+        (old: PaginatedResponse<LeadSummary> | undefined) => {
           if (!old) return old;
           return {
             ...old,
-            items: old.items.map((lead: Lead) =>
+            items: old.items.map((lead: LeadSummary) =>
               lead.id === updatedLead.id ? {
                 ...lead,
-                ...updatedLead,
-                stage_history: updatedLead.stage_history,
-                stage_updated_at: updatedLead.stage_updated_at,
+                name: updatedLead.name,
+                email: updatedLead.email,
+                company: updatedLead.company,
                 current_stage: updatedLead.current_stage,
                 status: updatedLead.status,
-                engaged: updatedLead.engaged
+                engaged: updatedLead.engaged,
+                last_contacted: updatedLead.last_contacted
               } : lead
             ),
           };
         }
       );
+      queryClient.setQueryData<Lead>(['leads', 'detail', updatedLead.id], updatedLead);
 
       queryClient.invalidateQueries({ 
         queryKey: ['leads']
@@ -193,4 +193,32 @@ export function useLeads(initialFilters: LeadFilters): UseLeadsReturn {
     onPageSizeChange: (limit: number) => setFilters(prev => ({ ...prev, limit, page: 1 })),
     onSearch: (search: string) => setFilters(prev => ({ ...prev, search, page: 1 }))
   };
-}
\ No newline at end of file
+}
+
+/**
+ * Full lead for the details sheet and edit modal.
+ * List pages only carry the compact LeadSummary.
+ */
+export function useLead(id: string, enabled = true) {
+  return useQuery({
+    queryKey: ['leads', 'detail', id],
+    queryFn: () => leadsApi.getLead(id),
+    enabled,
+    staleTime: 1000 * 60,
+    refetchOnWindowFocus: false,
+  });
+}
+
+/**
+ * Stage history of a lead, oldest first. Stored separately from the lead,
+ * so it is only fetched where it is shown.
+ */
+export function useLeadHistory(id: string, enabled = true) {
+  return useQuery({
+    queryKey: ['leads', 'history', id],
+    queryFn: () => leadsApi.getLeadHistory(id),
+    enabled,
+    staleTime: 1000 * 60,
+    refetchOnWindowFocus: false,
+  });
+}
@@ -67,7 +67,7 @@ const LeadsPage: React.FC = () => {
 
   const handleExportAll = async () => {
     try {
-      await ExportService.exportLeads(filters, totalLeads)
+      await ExportService.exportLeads(filters)
       showToast.success('Export completed successfully')
     } catch (error) {
       showToast.error('Failed to export leads')
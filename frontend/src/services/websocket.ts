@@ -1,18 +1,40 @@
-import { Lead } from '../types/lead'
+import { Lead, LeadStage } from '../types/lead'
 
-type NotificationType = 'create' | 'update' | 'delete'
+type NotificationType = 'create' | 'update' | 'delete' | 'bulk_create' | 'bulk_update'
 
 interface WebSocketMessage {
   type: NotificationType
-  lead: Lead
+  id?: string
+  version?: number
+  // Full lead on create, id and name on delete
+  lead?: Lead
+  // Changed fields only, on update
+  changes?: Partial<Lead>
+  leadIds?: string[]
+  count?: number
   userId: string
   isRemote: boolean
 }
 
+// Changes the server should send; every given criterion must match
+export interface LeadSubscription {
+  stages?: LeadStage[]
+  engaged?: boolean
+  search?: string
+  leadIds?: string[]
+}
+
+// Changes made in quick succession arrive together
+interface BatchMessage {
+  type: 'batch'
+  events: WebSocketMessage[]
+}
+
 export class WebSocketService {
   private ws: WebSocket | null = null
   private userId: string
   private messageHandlers: ((message: WebSocketMessage) => void)[] = []
+  private subscription: LeadSubscription = {}
 
   constructor() {
     this.userId = this.generateUserId()
@@ -30,11 +52,12 @@ export class WebSocketService {
 
       this.ws.onmessage = (event) => {
         try {
-          const message: WebSocketMessage = JSON.parse(event.data)
+          const data: WebSocketMessage | BatchMessage = JSON.parse(event.data)
+          const messages = data.type === 'batch' ? data.events : [data]
           // Only process messages from other users
-          if (message.userId !== this.userId) {
-            this.messageHandlers.forEach(handler => handler(message))
-          }
+          messages
+            .filter(message => message.userId !== this.userId)
+            .forEach(message => this.messageHandlers.forEach(handler => handler(message)))
         } catch (error) {
           console.error('Error processing WebSocket message:', error)
         }
@@ -52,6 +75,8 @@ export class WebSocketService {
 
       this.ws.onopen = () => {
         console.log('WebSocket connection established')
+        // The server forgets subscriptions when the connection drops
+        this.sendSubscription()
       }
     } catch (error) {
       console.error('Error creating WebSocket connection:', error)
@@ -67,6 +92,17 @@ export class WebSocketService {
     }
   }
 
+  public setSubscription(subscription: LeadSubscription) {
+    this.subscription = subscription
+    this.sendSubscription()
+  }
+
+  private sendSubscription() {
+    if (this.ws?.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify({ type: 'subscribe', ...this.subscription }))
+    }
+  }
+
   public getUserId(): string {
     return this.userId
   }
@@ -17,12 +17,17 @@ export interface Lead {
   engaged: boolean;
   current_stage: LeadStage;
   stage_updated_at: string;
-  stage_history: StageHistory[];
   last_contacted: string;
   created_at: string;
   updated_at: string;
 }
 
+// Compact lead returned by the list endpoint; get a lead by id for the rest
+export type LeadSummary = Pick<
+  Lead,
+  'id' | 'name' | 'email' | 'company' | 'status' | 'engaged' | 'current_stage' | 'last_contacted'
+>
+
 export interface LeadCreate {
   name: string;
   email: string;
@@ -41,7 +46,6 @@ export interface LeadUpdate {
   engaged?: boolean;
   last_contacted?: string;
   status?: string;
-  stage_history?: StageHistoryItem[];
   stage_updated_at?: string;
 }
 
@@ -52,6 +56,12 @@ export interface StageHistoryItem {
   notes?: string;
 }
 
+// A recorded stage transition, as returned by GET /leads/{id}/history
+export interface StageEvent extends StageHistoryItem {
+  id: string;
+  lead_id: string;
+}
+
 export interface LeadFilters {
   search?: string;
   sortBy?: string;
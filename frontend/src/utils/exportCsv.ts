@@ -1,58 +1,43 @@
-import { Lead } from '../types/lead'
 import { format } from 'date-fns'
 import { LeadFilters } from '../types/lead'
-import { leadsApi } from '../api/leads'
+import { api } from '../api/axios'
 
 export class ExportService {
-  private static readonly HEADERS = [
-    'Name',
-    'Company',
-    'Stage',
-    'Engaged',
-    'Last Contacted',
-    'Email'
+  private static readonly FIELDS = [
+    'name',
+    'company',
+    'current_stage',
+    'engaged',
+    'last_contacted',
+    'email'
   ]
 
-  private static formatRow(lead: Lead): string[] {
-    return [
-      lead.name,
-      lead.company,
-      lead.current_stage,
-      lead.engaged ? 'Yes' : 'No',
-      lead.last_contacted ? format(new Date(lead.last_contacted), 'MMM d, yyyy') : '-',
-      lead.email
-    ]
-  }
+  private static buildExportUrl(filters: LeadFilters): string {
+    const { search, sortBy, sortDesc } = filters
+
+    const params = new URLSearchParams({
+      format: 'csv',
+      fields: this.FIELDS.join(','),
+      ...(sortBy && { sort_by: sortBy }),
+      ...(sortDesc !== undefined && { sort_desc: sortDesc.toString() }),
+      ...(search && { search }),
+    })
 
-  private static createCSV(leads: Lead[]): string {
-    const rows = leads.map(this.formatRow)
-    return [
-      this.HEADERS.join(','),
-      ...rows.map(row => row.join(','))
-    ].join('\n')
+    return `${api.defaults.baseURL}/leads/export?${params}`
   }
 
-  private static downloadCSV(content: string, filename: string): void {
-    const blob = new Blob([content], { type: 'text/csv;charset=utf-8;' })
-    const url = URL.createObjectURL(blob)
+  private static downloadFile(url: string, filename: string): void {
+    // Let the browser stream the response straight to disk
     const link = document.createElement('a')
     link.setAttribute('href', url)
     link.setAttribute('download', filename)
     document.body.appendChild(link)
     link.click()
     link.remove()
-    URL.revokeObjectURL(url)
   }
 
-  static async exportLeads(filters: LeadFilters, totalCount: number): Promise<void> {
-    const response = await leadsApi.getLeads({
-      ...filters,
-      limit: totalCount,
-      page: 1
-    })
-
-    const csvContent = this.createCSV(response.items)
+  static async exportLeads(filters: LeadFilters): Promise<void> {
     const filename = `all-leads-${format(new Date(), 'yyyy-MM-dd')}.csv`
-    this.downloadCSV(csvContent, filename)
+    this.downloadFile(this.buildExportUrl(filters), filename)
   }
-}
\ No newline at end of file
+}